@@ -2,13 +2,37 @@
 
 from __future__ import annotations
 
+import bisect
+import gzip
 import hashlib
+import heapq
 import json
-from collections import Counter, defaultdict
-from collections.abc import Iterator
-from itertools import count
+import mmap
+import operator
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager, nullcontext
+from itertools import combinations_with_replacement, count, islice
 from pathlib import Path
-from typing import Iterable
+from typing import TYPE_CHECKING, Callable, Iterable, NamedTuple, Sequence
+
+if TYPE_CHECKING:
+    # Imported where pools are started, so that plain searches do not load the
+    # multiprocessing machinery.
+    from concurrent.futures import Executor, ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
 
 
 def treedict():
@@ -94,26 +118,576 @@ def minimize(matrix, root):
     }
 
 
-def build_dawg(words: Iterable[str]) -> dict[str, dict[str, str]]:
-    tree = make_tree(words)
-    trunk = convert(tree)
-    root = simplify(trunk)
-    matrix = traverse(root)
-    return minimize(matrix, root)
+def build_dawg(
+    words: Iterable[str], processes: int | None = None
+) -> dict[str, dict[str, str]]:
+    words = sorted(set(words))
+    if processes and len(words) > 1:
+        return _build_sharded(words, processes)
+    return build_sorted_dawg(words)
+
+
+def build_sorted_dawg(words: Iterable[str]) -> dict[str, dict[str, str]]:
+    return _number(*_build_sorted(words))
+
+
+def _build_sorted(words: Iterable[str]) -> tuple[list[dict[str, int]], list[bool]]:
+    # Incremental construction for sorted input (Daciuk et al. 2000). Only the
+    # path of the previous word is unminimized; every other node is already in
+    # the register of unique (final, branches) signatures.
+    children: list[dict[str, int]] = [{}]
+    final = [False]
+    register: dict[tuple, int] = {}
+    unused: list[int] = []
+    path = [0]
+    previous = ''
+
+    def replace_or_register(depth: int) -> None:
+        while len(path) > depth + 1:
+            node = path.pop()
+            signature = (final[node], tuple(children[node].items()))
+            match = register.setdefault(signature, node)
+            if match != node:
+                children[path[-1]][previous[len(path) - 1]] = match
+                children[node] = {}
+                final[node] = False
+                unused.append(node)
+
+    for word in words:
+        if word <= previous and previous:
+            if word == previous:
+                continue
+            raise ValueError(f'words are not sorted: {previous!r} before {word!r}')
+
+        prefix = 0
+        for alpha, beta in zip(previous, word):
+            if alpha != beta:
+                break
+            prefix += 1
+
+        replace_or_register(prefix)
+        node = path[-1]
+        for letter in word[prefix:]:
+            if unused:
+                child = unused.pop()
+            else:
+                child = len(children)
+                children.append({})
+                final.append(False)
+            children[node][letter] = child
+            path.append(child)
+            node = child
+        final[node] = True
+        previous = word
+
+    replace_or_register(0)
+    return children, final
+
+
+def _build_shard(words: list[str]) -> list[tuple[bool, tuple[tuple[str, int], ...]]]:
+    # A minimal graph as (final, branches) rows in post-order, so children
+    # come before their parents and the root is last. Branches refer to rows.
+    children, final = _build_sorted(words)
+    rows: dict[int, int] = {}
+    table = []
+    stack = [(0, iter(children[0].values()))]
+    while stack:
+        node, branches = stack[-1]
+        for child in branches:
+            if child not in rows:
+                stack.append((child, iter(children[child].values())))
+                break
+        else:
+            stack.pop()
+            rows[node] = len(table)
+            branches = tuple(
+                (letter, rows[child]) for letter, child in children[node].items()
+            )
+            table.append((final[node], branches))
+    return table
+
+
+def _merge_shards(
+    tables: list[list[tuple[bool, tuple[tuple[str, int], ...]]]],
+) -> tuple[list[dict[str, int]], list[bool]]:
+    # Nodes from every shard go through one register of (final, branches)
+    # signatures, children first, so equal suffix graphs become one node.
+    # Shards cover disjoint runs of words, so only the roots and the paths of
+    # prefixes shared across a cut need their branches combined.
+    children: list[dict[str, int]] = [{}]
+    final = [False]
+    register: dict[tuple, int] = {}
+
+    def add(is_final: bool, branches: dict[str, int]) -> int:
+        signature = (is_final, tuple(branches.items()))
+        node = register.get(signature)
+        if node is None:
+            node = register[signature] = len(children)
+            children.append(branches)
+            final.append(is_final)
+        return node
+
+    def union(sources: list[tuple[bool, dict[str, int]]]) -> tuple[bool, dict]:
+        branches = {}
+        for letter in sorted({letter for _, other in sources for letter in other}):
+            nodes = list(dict.fromkeys(o[letter] for _, o in sources if letter in o))
+            if len(nodes) == 1:
+                branches[letter] = nodes[0]
+            else:
+                merged = union([(final[node], children[node]) for node in nodes])
+                branches[letter] = add(*merged)
+        return any(is_final for is_final, _ in sources), branches
+
+    roots = []
+    for table in tables:
+        nodes: list[int] = []
+        for is_final, branches in table[:-1]:
+            nodes.append(
+                add(is_final, {letter: nodes[row] for letter, row in branches})
+            )
+        is_final, branches = table[-1]
+        roots.append((is_final, {letter: nodes[row] for letter, row in branches}))
+
+    final[0], children[0] = union(roots)
+    return children, final
+
+
+def _build_sharded(words: list[str], processes: int) -> dict[str, dict[str, str]]:
+    # Cut the sorted words into a few runs per process, build each run's
+    # minimal graph in the pool, then merge them. The merged graph is minimal
+    # too, so numbering gives the same result as build_sorted_dawg().
+    from concurrent.futures import ProcessPoolExecutor
+
+    size = -(-len(words) // (4 * processes))
+    shards = [words[start : start + size] for start in range(0, len(words), size)]
+    with ProcessPoolExecutor(processes) as executor:
+        tables = list(executor.map(_build_shard, shards))
+    return _number(*_merge_shards(tables))
+
+
+def build_gaddag(words: Iterable[str]) -> dict[str, dict[str, str]]:
+    # Every word is stored once per split point as its reversed prefix, the
+    # ">" separator and the remaining suffix. The paths are fed to
+    # build_sorted_dawg() one starting letter at a time so that only a
+    # fraction of them is held in memory.
+    words = list(words)
+    letters = sorted(set(''.join(words)))
+
+    def paths() -> Iterator[str]:
+        for letter in letters:
+            batch = [
+                word[index::-1] + '>' + word[index + 1 :]
+                for word in words
+                for index, other in enumerate(word)
+                if other == letter
+            ]
+            batch.sort()
+            yield from batch
+
+    return build_sorted_dawg(paths())
+
+
+def _number(children: list[dict[str, int]], final: list[bool]):
+    # Match minimize(): nodes are numbered by descending reference count with
+    # ties broken by post-order position, and the root is always "0".
+    order = []
+    visited = {0}
+    stack = [(0, iter(children[0].values()))]
+    while stack:
+        node, branches = stack[-1]
+        for child in branches:
+            if child not in visited:
+                visited.add(child)
+                stack.append((child, iter(children[child].values())))
+                break
+        else:
+            stack.pop()
+            order.append(node)
+
+    references = Counter(child for node in order for child in children[node].values())
+    ranked = sorted(order[:-1], key=lambda node: -references[node])
+    num_map = {0: '0'}
+    num_map.update((node, str(num)) for num, node in enumerate(ranked, 1))
+
+    data = {}
+    for node in order:
+        branches = {'$': '0'} if final[node] else {}
+        branches.update(
+            (letter, num_map[child]) for letter, child in children[node].items()
+        )
+        data[num_map[node]] = branches
+    return data
+
+
+def update_dawg(
+    data: dict[str, dict[str, str]],
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+) -> dict[str, dict[str, str]]:
+    # Update a minimized graph in place. Each changed word's path is made
+    # private by cloning shared nodes, edited, then re-minimized bottom-up
+    # against the register of unchanged nodes. Untouched nodes keep their IDs.
+    register = {_signature(branches): node for node, branches in data.items()}
+    register.pop(_signature(data['0']), None)
+    references = Counter(
+        child
+        for branches in data.values()
+        for letter, child in branches.items()
+        if letter != '$'
+    )
+    unused: list[int] = []
+    size = len(data)
+
+    def allocate() -> str:
+        nonlocal size
+        if unused:
+            return str(heapq.heappop(unused))
+        size += 1
+        return str(size - 1)
+
+    def release(node: str) -> None:
+        references[node] -= 1
+        if references[node]:
+            return
+        branches = data.pop(node)
+        if register.get(_signature(branches)) == node:
+            del register[_signature(branches)]
+        for letter, child in branches.items():
+            if letter != '$':
+                release(child)
+        heapq.heappush(unused, int(node))
+
+    def privatize(word: str) -> list[str]:
+        path = ['0']
+        for letter in word:
+            child = data[path[-1]].get(letter)
+            if child is None:
+                break
+            if references[child] > 1:
+                clone = allocate()
+                data[clone] = dict(data[child])
+                references.update(
+                    grandchild for key, grandchild in data[clone].items() if key != '$'
+                )
+                references[child] -= 1
+                references[clone] = 1
+                data[path[-1]][letter] = clone
+                child = clone
+            else:
+                register.pop(_signature(data[child]), None)
+            path.append(child)
+        return path
+
+    def reregister(word: str, path: list[str]) -> None:
+        for depth in range(len(path) - 1, 0, -1):
+            node = path[depth]
+            parent = data[path[depth - 1]]
+            letter = word[depth - 1]
+            if not data[node]:
+                del parent[letter]
+                release(node)
+                continue
+            match = register.setdefault(_signature(data[node]), node)
+            if match != node:
+                parent[letter] = match
+                references[match] += 1
+                release(node)
+
+    for word in remove:
+        if not _contains(data, word):
+            continue
+        path = privatize(word)
+        del data[path[-1]]['$']
+        reregister(word, path)
+
+    for word in add:
+        if _contains(data, word):
+            continue
+        path = privatize(word)
+        for letter in word[len(path) - 1 :]:
+            child = allocate()
+            data[child] = {}
+            references[child] = 1
+            data[path[-1]][letter] = child
+            path.append(child)
+        data[path[-1]]['$'] = '0'
+        reregister(word, path)
+
+    # Keep IDs dense by moving the highest-numbered nodes into any gaps.
+    size = len(data)
+    highest = sorted(int(node) for node in data if int(node) >= size)
+    gaps = [num for num in sorted(unused) if num < size]
+    moves = {str(old): str(new) for old, new in zip(highest, gaps)}
+    return _renumber(data, moves)
+
+
+def _renumber(data: dict[str, dict[str, str]], moves: dict[str, str]):
+    for old, new in moves.items():
+        data[new] = data.pop(old)
+    if moves:
+        for branches in data.values():
+            for letter, child in branches.items():
+                if child in moves:
+                    branches[letter] = moves[child]
+    return data
+
+
+def _signature(branches: dict[str, str]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted(branches.items()))
+
+
+def _contains(data: dict[str, dict[str, str]], word: str) -> bool:
+    state = '0'
+    for letter in word:
+        state = data[state].get(letter)
+        if state is None:
+            return False
+    return '$' in data[state]
+
+
+def iter_words(data: dict[str, dict[str, str]]) -> Iterator[str]:
+    stack = [('0', '')]
+    while stack:
+        state, prefix = stack.pop()
+        branches = data[state]
+        if '$' in branches and prefix:
+            yield prefix
+        for letter in sorted(branches, reverse=True):
+            if letter != '$':
+                stack.append((branches[letter], prefix + letter))
 
 
 PACKAGE_DIR = Path(__file__).resolve().parent
 PROJECT_DIR = PACKAGE_DIR.parent
 WORDS_TXT = PACKAGE_DIR / 'words.txt'
 DAWG_JS = PACKAGE_DIR / 'dawg.js'
-WEBSITE_DAWG_JS = PROJECT_DIR / 'www' / 'dawg.js'
+DAWG_BIN = PACKAGE_DIR / 'dawg.bin'
+ANAGRAMS_TXT = PACKAGE_DIR / 'anagrams.txt'
+GADDAG_BIN = PACKAGE_DIR / 'gaddag.bin'
+WEBSITE_DIR = PROJECT_DIR / 'www'
+WEBSITE_DAWG_JS = WEBSITE_DIR / 'dawg.js'
+WEBSITE_DAWG_BIN = WEBSITE_DIR / 'dawg.bin'
+MANIFEST_JSON = WEBSITE_DIR / 'manifest.json'
 SERVICE_WORKER_JS = PACKAGE_DIR / 'service-worker.js'
-INDEX_HTML = PROJECT_DIR / 'www' / 'index.html'
-MAIN_JS = PROJECT_DIR / 'www' / 'main.js'
-STYLES_CSS = PROJECT_DIR / 'www' / 'styles.css'
+INDEX_HTML = WEBSITE_DIR / 'index.html'
+INDEX_TEMPLATE_HTML = PACKAGE_DIR / 'index.html'
+MAIN_JS = WEBSITE_DIR / 'main.js'
+STYLES_CSS = WEBSITE_DIR / 'styles.css'
+ASSETS = ('styles.css', 'main.js', 'worker.js', 'dawg.bin')
 ALPHABET = tuple('abcdefghijklmnopqrstuvwxyz')
+BITS = {letter: 1 << index for index, letter in enumerate(ALPHABET)}
+LETTERS = (1 << len(ALPHABET)) - 1
+END = 1 << 31
+BLANK = len(ALPHABET)
+# GADDAG paths spell a reversed prefix, then the separator, then the suffix.
+SEPARATOR = 1 << len(ALPHABET)
+EDGE_BITS = {**BITS, '>': SEPARATOR}
+SPLIT_DEPTH = 2
+
+
+class Graph(NamedTuple):
+    # Node ``num`` has a child for ``ALPHABET[i]`` when bit ``i`` of
+    # ``masks[num]`` is set and ends a word when ``END`` is set. GADDAGs also
+    # use the ``SEPARATOR`` bit. Children are stored in bit order at
+    # ``edges[offsets[num] : offsets[num + 1]]``.
+    masks: Sequence[int]
+    offsets: Sequence[int]
+    edges: Sequence[int]
+    # Optional pruning annotations from annotate(): the letters used by any
+    # word ending below each node and the shortest and longest such ending.
+    reach: Sequence[int] | None = None
+    shortest: Sequence[int] | None = None
+    longest: Sequence[int] | None = None
+
+
+# Binary layout: header, then little-endian uint32 masks, offsets and edges,
+# then uint32 reach and uint8 shortest and longest when ANNOTATED is flagged.
+# NARROW stores edges as uint16 and IMPLICIT omits offsets, which readers
+# rebuild from the masks. Each section is padded to a multiple of four bytes.
+# The checksum is the CRC-32 of everything after the header.
+MAGIC = b'KJXQZDWG'
+VERSION = 3
+HEADER = struct.Struct('<8sIIIII')
+ANNOTATED = 1
+NARROW = 2
+IMPLICIT = 4
+
+_DAWG: Graph | None = None
+_GADDAG: Graph | None = None
+_BOUNDS: OrderedDict[tuple[int, tuple[int, ...]], tuple[Graph, array]] = OrderedDict()
+_BOUNDS_LOCK = threading.Lock()
+_ANAGRAMS: bytes | mmap.mmap | None = None
+_REGISTRY: dict[str, dict[str, str | Path | None]] = {}
+_LEXICONS: dict[str, Dawg] = {}
+_GRAPHS: dict[bytes, Graph] = {}
+_REGISTRY_LOCK = threading.RLock()
+_STATS_HOOK: Callable[[dict], None] | None = None
+_POOLS: OrderedDict[tuple[int, int], tuple[Graph | None, Executor]] = OrderedDict()
+_POOL_USERS: dict[Executor, int] = {}
+_POOLS_LOCK = threading.Lock()
+if hasattr(os, 'register_at_fork'):
+    # A forked child cannot use its parent's pools.
+    os.register_at_fork(after_in_child=_POOLS.clear)
+    os.register_at_fork(after_in_child=_POOL_USERS.clear)
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    maxwords: int
+    currsize: int
+    words: int
+
+
+class LRUCache:
+    # Search results keyed by rack letter counts and the contains substring or
+    # pattern. The cache empties itself whenever it is used with a different
+    # graph.
+
+    def __init__(self, maxsize: int = 256, maxwords: int = 100_000):
+        self.maxsize = maxsize
+        self.maxwords = maxwords
+        self.hits = 0
+        self.misses = 0
+        self._graph: Graph | None = None
+        self._entries: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+        self._words = 0
+        self._lock = threading.Lock()
+
+    def get(self, graph: Graph, key: tuple) -> tuple[str, ...] | None:
+        with self._lock:
+            self._check(graph)
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return results
+
+    def put(self, graph: Graph, key: tuple, results: Iterable[str]) -> None:
+        results = tuple(results)
+        with self._lock:
+            self._check(graph)
+            if key in self._entries:
+                self._words -= len(self._entries.pop(key))
+            if self.maxsize <= 0 or len(results) > self.maxwords:
+                return
+            self._entries[key] = results
+            self._words += len(results)
+            self._evict()
+
+    def resize(self, maxsize: int | None = None, maxwords: int | None = None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if maxwords is not None:
+                self.maxwords = maxwords
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._words = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self.maxsize,
+                self.maxwords,
+                len(self._entries),
+                self._words,
+            )
+
+    def _check(self, graph: Graph) -> None:
+        if graph is not self._graph:
+            self._graph = graph
+            self._entries.clear()
+            self._words = 0
+
+    def _evict(self) -> None:
+        entries = self._entries
+        while entries and (len(entries) > self.maxsize or self._words > self.maxwords):
+            _, results = entries.popitem(last=False)
+            self._words -= len(results)
+
+
+_CACHE = LRUCache()
+
+
+def cache_info() -> CacheInfo:
+    return _CACHE.info()
+
+
+def cache_clear() -> None:
+    _CACHE.clear()
+
+
+def cache_resize(maxsize: int | None = None, maxwords: int | None = None) -> None:
+    _CACHE.resize(maxsize=maxsize, maxwords=maxwords)
+
+
+class Stats:
+    # Counters that searches and builds add to when passed as ``stats``. The
+    # DAWG engine counts nodes entered, edges tried from them, blank tiles
+    # tried and children pruned by annotations when a search runs to the end.
+    # Builds record seconds per phase.
+
+    def __init__(self):
+        self.searches = 0
+        self.cache_hits = 0
+        self.words = 0
+        self.nodes = 0
+        self.edges = 0
+        self.blanks = 0
+        self.pruned = 0
+        self.seconds = 0.0
+        self.phases: dict[str, float] = {}
+
+    def __repr__(self) -> str:
+        return f'Stats({self.as_dict()})'
+
+    def as_dict(self) -> dict:
+        return {**vars(self), 'phases': dict(self.phases)}
+
+    def add(self, other: Stats) -> None:
+        for name, value in vars(other).items():
+            if name != 'phases':
+                setattr(self, name, getattr(self, name) + value)
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+
+def set_stats_hook(hook: Callable[[dict], None] | None) -> None:
+    # The hook receives a record for every search(), search_many() and build()
+    # call: its event name, the query and that call's Stats.as_dict().
+    global _STATS_HOOK
+    _STATS_HOOK = hook
+
+
+def _phase(stats: Stats | None, name: str):
+    return nullcontext() if stats is None else stats.phase(name)
 
-_DAWG: dict[str, dict[str, str]] | None = None
+
+def _report(event: str, stats: Stats, total: Stats | None, **query) -> None:
+    if total is not None:
+        total.add(stats)
+    if _STATS_HOOK is not None:
+        _STATS_HOOK({'event': event, **query, **stats.as_dict()})
 
 
 def load_words(words_filename: str | Path = WORDS_TXT) -> list[str]:
@@ -134,7 +708,208 @@ def _write_dawg(data: dict[str, dict[str, str]], filename: str | Path) -> None:
     path.write_text(_to_dawg_js(data), encoding='utf-8')
 
 
-def load(filename: str | Path = DAWG_JS) -> dict[str, dict[str, str]]:
+def _write_website_dawg(data: dict[str, dict[str, str]], filename: str | Path) -> None:
+    # Browsers fetch a packed binary graph unless a JavaScript file is asked for.
+    if Path(filename).suffix == '.js':
+        _write_dawg(data, filename)
+    else:
+        _write_dawg_bin(compact(data), filename, narrow=True, implicit=True)
+
+
+def compact(data: dict[str, dict[str, str]]) -> Graph:
+    size = len(data)
+    masks = array('I', [0]) * size
+    offsets = array('I', [0]) * (size + 1)
+    edges = array('I')
+
+    for num in range(size):
+        branches = data[str(num)]
+        mask = END if '$' in branches else 0
+        for letter, bit in EDGE_BITS.items():
+            if letter in branches:
+                mask |= bit
+                edges.append(int(branches[letter]))
+        masks[num] = mask
+        offsets[num + 1] = len(edges)
+
+    return Graph(masks, offsets, edges)
+
+
+def expand(graph: Graph) -> dict[str, dict[str, str]]:
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    data = {}
+
+    for num, mask in enumerate(masks):
+        children = iter(edges[offsets[num] : offsets[num + 1]])
+        branches = {
+            letter: str(next(children))
+            for letter, bit in EDGE_BITS.items()
+            if mask & bit
+        }
+        if mask & END:
+            branches['$'] = '0'
+        data[str(num)] = branches
+
+    return data
+
+
+def _postorder(graph: Graph) -> list[int]:
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    visited = bytearray(len(masks))
+    order = []
+    stack = [0]
+
+    while stack:
+        state = stack.pop()
+        if state < 0:
+            order.append(~state)
+        elif not visited[state]:
+            visited[state] = 1
+            stack.append(~state)
+            stack.extend(edges[offsets[state] : offsets[state + 1]])
+
+    return order
+
+
+def annotate(graph: Graph) -> Graph:
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    size = len(masks)
+    reach = array('I', [0]) * size
+    shortest = array('B', [0]) * size
+    longest = array('B', [0]) * size
+
+    for state in _postorder(graph):
+        mask = masks[state]
+        letters = mask & LETTERS
+        low = 0 if mask & END else 255
+        high = 0
+        for child in edges[offsets[state] : offsets[state + 1]]:
+            letters |= reach[child]
+            low = min(low, shortest[child] + 1)
+            high = max(high, longest[child] + 1)
+        if high > 255:
+            raise ValueError('words longer than 255 letters are not supported')
+        reach[state] = letters
+        shortest[state] = low
+        longest[state] = high
+
+    return graph._replace(reach=reach, shortest=shortest, longest=longest)
+
+
+def _sections(size: int, edge_count: int, flags: int) -> list[tuple[str, str, int]]:
+    sections = [('masks', 'I', size)]
+    if not flags & IMPLICIT:
+        sections.append(('offsets', 'I', size + 1))
+    sections.append(('edges', 'H' if flags & NARROW else 'I', edge_count))
+    if flags & ANNOTATED:
+        sections += [
+            ('reach', 'I', size),
+            ('shortest', 'B', size),
+            ('longest', 'B', size),
+        ]
+    return sections
+
+
+def _padded(length: int) -> int:
+    return -(-length // 4) * 4
+
+
+def _to_dawg_bin(graph: Graph, narrow: bool = False, implicit: bool = False) -> bytes:
+    flags = 0 if graph.reach is None else ANNOTATED
+    if narrow and len(graph.masks) <= 1 << 16:
+        flags |= NARROW
+    if implicit:
+        flags |= IMPLICIT
+    sections = _sections(len(graph.masks), len(graph.edges), flags)
+    payload = bytearray()
+    for field, typecode, _ in sections:
+        payload += _little_endian(array(typecode, getattr(graph, field)))
+        payload += bytes(_padded(len(payload)) - len(payload))
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        flags,
+        len(graph.masks),
+        len(graph.edges),
+        zlib.crc32(payload),
+    )
+    return header + payload
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_dawg_bin(graph: Graph, filename: str | Path, **options: bool) -> None:
+    path = Path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(_to_dawg_bin(graph, **options))
+
+
+def _load_bin(filename: str | Path, verify: bool = True) -> Graph:
+    with open(filename, 'rb') as reader:
+        buffer = memoryview(mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ))
+
+    if len(buffer) < HEADER.size:
+        raise ValueError(f'{filename} is not a kjxqz DAWG file')
+    header = HEADER.unpack(buffer[: HEADER.size])
+    magic, version, flags, size, edge_count, checksum = header
+    if magic != MAGIC:
+        raise ValueError(f'{filename} is not a kjxqz DAWG file')
+    if version != VERSION:
+        raise ValueError(f'{filename} has unsupported DAWG version {version}')
+
+    sections = _sections(size, edge_count, flags)
+    payload = buffer[HEADER.size :]
+    lengths = [_padded(array(code).itemsize * length) for _, code, length in sections]
+    if len(payload) != sum(lengths):
+        raise ValueError(f'{filename} is truncated')
+    if verify and zlib.crc32(payload) != checksum:
+        raise ValueError(f'{filename} failed checksum verification')
+
+    values = {}
+    start = 0
+    for (field, typecode, length), padded in zip(sections, lengths):
+        end = start + array(typecode).itemsize * length
+        section = payload[start:end].cast(typecode)
+        if sys.byteorder != 'little' and section.itemsize > 1:
+            section = array(typecode, section)
+            section.byteswap()
+        values[field] = section
+        start += padded
+
+    if flags & IMPLICIT:
+        offsets = array('I', [0]) * (size + 1)
+        total = 0
+        for num, mask in enumerate(values['masks'], 1):
+            total += (mask & (LETTERS | SEPARATOR)).bit_count()
+            offsets[num] = total
+        values['offsets'] = offsets
+
+    return Graph(**values)
+
+
+def load(filename: str | Path = DAWG_BIN, verify: bool = True) -> Graph:
+    graph = _read(filename, verify=verify)
+
+    global _DAWG
+    _DAWG = graph
+    _CACHE.clear()
+    return graph
+
+
+def _read(filename: str | Path, verify: bool = True) -> Graph:
+    with open(filename, 'rb') as reader:
+        is_binary = reader.read(len(MAGIC)) == MAGIC
+
+    if is_binary:
+        return _load_bin(filename, verify=verify)
+    return _load_js(filename)
+
+
+def _load_js(filename: str | Path) -> Graph:
     text = Path(filename).read_text(encoding='utf-8').strip()
     if text.startswith('var dawg ='):
         payload = text[len('var dawg =') :].strip()
@@ -143,101 +918,1868 @@ def load(filename: str | Path = DAWG_JS) -> dict[str, dict[str, str]]:
     else:
         payload = text
 
-    data = json.loads(payload)
-
-    global _DAWG
-    _DAWG = data
-    return data
+    return compact(json.loads(payload))
 
 
-def _get_dawg() -> dict[str, dict[str, str]]:
+def _get_dawg() -> Graph:
     if _DAWG is None:
         raise RuntimeError('DAWG is not loaded. Call kjxqz.load() first.')
     return _DAWG
 
 
-def isearch(letters: str, contains: str = '') -> Iterator[str]:
-    letters = letters.lower()
+def count_letters(letters: str) -> list[int]:
+    counts = [0] * (len(ALPHABET) + 1)
+    for letter in letters.lower():
+        if letter == '?':
+            counts[BLANK] += 1
+        elif letter in BITS:
+            counts[ord(letter) - ord('a')] += 1
+    return counts
+
+
+def _matcher(contains: str) -> tuple[list[list[int]], list[bool]]:
+    # Automaton over rack letters placed before ``contains``. ``transitions``
+    # tracks the longest prefix of ``contains`` that ends the placed letters
+    # and ``starts[k]`` is true when placing ``contains`` after such a prefix
+    # is its leftmost occurrence. Anchoring every word at its leftmost
+    # occurrence generates each word once.
+    size = len(contains)
+    transitions = []
+    for length in range(size):
+        row = []
+        for letter in ALPHABET:
+            text = contains[:length] + letter
+            match = next(
+                end
+                for end in range(min(len(text), size), -1, -1)
+                if text.endswith(contains[:end])
+            )
+            row.append(match)
+        transitions.append(row)
+    starts = [
+        (contains[:length] + contains).find(contains) == length
+        for length in range(size)
+    ]
+    return transitions, starts
+
+
+def build_anagrams(words: Iterable[str]) -> dict[str, list[str]]:
+    index = defaultdict(list)
+    for word in sorted(set(words)):
+        index[''.join(sorted(word))].append(word)
+    return dict(sorted(index.items()))
+
+
+def _write_anagrams(index: dict[str, list[str]], filename: str | Path) -> None:
+    # One "signature word word ..." line per signature, sorted by signature so
+    # lookups can binary search the file without parsing it.
+    path = Path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = (f'{signature} {" ".join(words)}\n' for signature, words in index.items())
+    path.write_text(''.join(lines), encoding='utf-8')
+
+
+def load_anagrams(filename: str | Path = ANAGRAMS_TXT) -> bytes | mmap.mmap:
+    buffer = _read_anagrams(filename)
+
+    global _ANAGRAMS
+    _ANAGRAMS = buffer
+    return buffer
+
+
+def _read_anagrams(filename: str | Path) -> bytes | mmap.mmap:
+    with open(filename, 'rb') as reader:
+        if Path(filename).stat().st_size:
+            return mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+        return b''
+
+
+def load_gaddag(filename: str | Path = GADDAG_BIN, verify: bool = True) -> Graph:
+    graph = _read(filename, verify=verify)
+
+    global _GADDAG
+    _GADDAG = graph
+    return graph
+
+
+def _lookup_anagrams(buffer: bytes | mmap.mmap, signature: bytes) -> list[str]:
+    low, high = 0, len(buffer)
+    while low < high:
+        middle = (low + high) // 2
+        start = buffer.rfind(b'\n', 0, middle) + 1
+        if buffer[start : buffer.find(b' ', start)] < signature:
+            low = buffer.find(b'\n', start) + 1
+        else:
+            high = start
+
+    end = buffer.find(b'\n', low)
+    key, _, words = buffer[low:end].partition(b' ')
+    return words.decode().split() if key == signature else []
+
+
+def _search_exact(buffer: bytes | mmap.mmap, letters: str, contains: str) -> list[str]:
     contains = contains.lower()
+    counts = count_letters(letters + contains)
+    if not all(letter in BITS for letter in contains):
+        return []
+
+    base = [letter * count for letter, count in zip(ALPHABET, counts)]
+    results = []
+    for blanks in combinations_with_replacement(ALPHABET, counts[BLANK]):
+        signature = ''.join(sorted(''.join(base) + ''.join(blanks)))
+        words = _lookup_anagrams(buffer, signature.encode())
+        results.extend(word for word in words if contains in word)
+
+    results.sort()
+    return results
 
-    dawg = _get_dawg()
-    value: list[str] = []
-    letters_list = list(letters)
-    contains_list = list(contains)
-    seen: set[str] = set()
-
-    def helper(state: str, contained: bool) -> Iterator[str]:
-        branches = dawg.get(state, {})
-
-        if contained:
-            if '$' in branches:
-                result = ''.join(value)
-                if result not in seen:
-                    seen.add(result)
-                    yield result
-            yield from traverse(state, True)
+
+def _cache_key(letters: str, contains: str) -> tuple[tuple[int, ...], str]:
+    return tuple(count_letters(letters)), contains.lower()
+
+
+def _sort(results: list[str]) -> list[str]:
+    results.sort(key=lambda word: (-len(word), word))
+    return results
+
+
+def _check_engine(engine: str) -> None:
+    # Checked before the cache, which is shared by every engine.
+    if engine not in ('dawg', 'gaddag'):
+        raise ValueError(f'unknown search engine {engine!r}')
+
+
+def _pattern_key(
+    pattern: str | None, min_length: int | None, max_length: int | None
+) -> tuple[str, int, int]:
+    pattern = (pattern or '').lower()
+    if any(letter != '?' and letter not in BITS for letter in pattern):
+        raise ValueError('pattern may contain only letters and ?')
+    low = len(pattern) if min_length is None else min_length
+    if max_length is not None:
+        high = max_length
+    elif pattern:
+        high = max(len(pattern), low)
+    else:
+        high = 255
+    return pattern, low, high
+
+
+def _search_key(
+    letters: str,
+    contains: str,
+    pattern: str | None,
+    min_length: int | None,
+    max_length: int | None,
+) -> tuple:
+    key = _cache_key(letters, contains)
+    if pattern is None and min_length is None and max_length is None:
+        return key
+    if contains:
+        raise ValueError('contains cannot be combined with a pattern')
+    return key[:1] + _pattern_key(pattern, min_length, max_length)
+
+
+class Dawg:
+    # A word graph with its own search cache, plus the optional GADDAG and
+    # anagram index for the same words. The module-level search functions use
+    # a Dawg over the graph from load(). Use lexicon() for registered ones.
+
+    def __init__(
+        self,
+        graph: Graph | None,
+        gaddag: Graph | None = None,
+        anagrams: bytes | mmap.mmap | None = None,
+        cache: LRUCache | None = None,
+    ):
+        self.graph = graph
+        self.gaddag = gaddag
+        self.anagrams = anagrams
+        self.cache = LRUCache() if cache is None else cache
+
+    @classmethod
+    def load(
+        cls,
+        filename: str | Path = DAWG_BIN,
+        gaddag: str | Path | None = None,
+        anagrams: str | Path | None = None,
+        verify: bool = True,
+    ) -> Dawg:
+        return cls(
+            _read_shared(filename, verify=verify),
+            None if gaddag is None else _read_shared(gaddag, verify=verify),
+            None if anagrams is None else _read_anagrams(anagrams),
+        )
+
+    def _get_graph(self) -> Graph:
+        if self.graph is None:
+            raise RuntimeError('DAWG is not loaded. Call kjxqz.load() first.')
+        return self.graph
+
+    def contains(self, word: str) -> bool:
+        graph = self._get_graph()
+        state = _walk(graph, word.lower())
+        return state >= 0 and bool(graph.masks[state] & END)
+
+    def has_prefix(self, prefix: str) -> bool:
+        return _walk(self._get_graph(), prefix.lower()) >= 0
+
+    def validate_many(self, words: Iterable[str]) -> list[bool]:
+        return _validate_many(self._get_graph(), [word.lower() for word in words])
+
+    def _isearch_key(
+        self, key: tuple, engine: str, stats: Stats | None = None
+    ) -> Iterator[str]:
+        graph = self._get_graph()
+        if len(key) > 2:
+            return _isearch_pattern(graph, *key)
+        if engine == 'gaddag' and key[1]:
+            if self.gaddag is None:
+                raise RuntimeError(
+                    'GADDAG is not loaded. Call kjxqz.load_gaddag() first.'
+                )
+            return _isearch_gaddag(self.gaddag, *key)
+        if stats is not None:
+            return _isearch_counted(graph, *key, None, stats)
+        return _isearch(graph, *key)
+
+    def isearch(
+        self,
+        letters: str,
+        contains: str = '',
+        pattern: str | None = None,
+        min_length: int | None = None,
+        max_length: int | None = None,
+        engine: str = 'dawg',
+        stats: Stats | None = None,
+    ) -> Iterator[str]:
+        _check_engine(engine)
+        key = _search_key(letters, contains, pattern, min_length, max_length)
+        return self._isearch_cached(key, engine, stats)
+
+    def _isearch_cached(
+        self, key: tuple, engine: str, stats: Stats | None = None
+    ) -> Iterator[str]:
+        graph = self._get_graph()
+        cached = self.cache.get(graph, key)
+        if stats is not None:
+            stats.searches += 1
+            stats.cache_hits += cached is not None
+        if cached is not None:
+            if stats is not None:
+                stats.words += len(cached)
+            yield from cached
             return
 
-        yield from traverse(state, False)
+        results = []
+        for word in self._isearch_key(key, engine, stats):
+            results.append(word)
+            yield word
+        if stats is not None:
+            stats.words += len(results)
+        self.cache.put(graph, key, _sort(results))
+
+    def isearch_ordered(
+        self,
+        letters: str,
+        contains: str = '',
+        offset: int = 0,
+        limit: int | None = None,
+        after: str | None = None,
+    ) -> Iterator[str]:
+        # Yield words in search() order. With a limit and no offset only the
+        # words up to the end of the page are looked for; pass the last word
+        # of a page as after to resume from it. An offset page would walk
+        # every word before it again, so it slices the cached full listing.
+        graph = self._get_graph()
+        key = _cache_key(letters, contains)
+        words = self.cache.get(graph, key)
+        stop = None if limit is None else offset + limit
+
+        if words is None and limit is not None and not offset:
+            words = _search_longest(graph, *key, limit, after)
+            # A short page from the start holds every word, so keep it.
+            if len(words) < limit and after is None:
+                self.cache.put(graph, key, words)
+        else:
+            if words is None:
+                words = self.search(letters, contains)
+            if after is not None:
+                start = bisect.bisect_right(words, _order(after), key=_order)
+                words = words[start:]
+
+        return islice(words, offset, stop)
+
+    def search(
+        self,
+        letters: str,
+        contains: str = '',
+        exact: bool = False,
+        pattern: str | None = None,
+        min_length: int | None = None,
+        max_length: int | None = None,
+        engine: str = 'dawg',
+        score: Mapping[str, int] | None = None,
+        limit: int | None = None,
+        workers: int | None = None,
+        stats: Stats | None = None,
+    ) -> list[str]:
+        options = (exact, pattern, min_length, max_length, engine, score, limit)
+        if stats is None and _STATS_HOOK is None:
+            return self._search(letters, contains, *options, workers, None)
+
+        current = Stats()
+        start = time.perf_counter()
+        results = self._search(letters, contains, *options, workers, current)
+        current.searches += 1
+        current.words += len(results)
+        current.seconds += time.perf_counter() - start
+        _report('search', current, stats, letters=letters, contains=contains)
+        return results
+
+    def _search(
+        self,
+        letters: str,
+        contains: str,
+        exact: bool,
+        pattern: str | None,
+        min_length: int | None,
+        max_length: int | None,
+        engine: str,
+        score: Mapping[str, int] | None,
+        limit: int | None,
+        workers: int | None,
+        stats: Stats | None,
+    ) -> list[str]:
+        _check_engine(engine)
+        key = _search_key(letters, contains, pattern, min_length, max_length)
+        if workers and (exact or score is not None or len(key) > 2):
+            raise ValueError(
+                'workers cannot be combined with exact, score or a pattern'
+            )
+        if workers and engine != 'dawg':
+            raise ValueError('workers requires the dawg engine')
+        if score is not None:
+            if exact or len(key) > 2:
+                raise ValueError('score cannot be combined with exact or a pattern')
+            values = tuple(score.get(letter, 0) for letter in ALPHABET)
+            if min(values) < 0:
+                raise ValueError('letter scores must not be negative')
+            return _search_scored(self._get_graph(), *key, values, limit)
+
+        if exact:
+            if len(key) > 2:
+                raise ValueError('exact cannot be combined with a pattern')
+            if self.anagrams is None:
+                raise RuntimeError(
+                    'Anagram index is not loaded. Call kjxqz.load_anagrams() first.'
+                )
+            return _search_exact(self.anagrams, letters, contains)[:limit]
+
+        graph = self._get_graph()
+        cached = self.cache.get(graph, key)
+        if cached is not None:
+            if stats is not None:
+                stats.cache_hits += 1
+            return list(cached[:limit])
+
+        if workers:
+            results = _search_parallel(graph, *key, workers)
+        else:
+            results = _sort(list(self._isearch_key(key, engine, stats)))
+        self.cache.put(graph, key, results)
+        return results[:limit]
+
+    def search_many(
+        self,
+        queries: Iterable[str | tuple[str, str]],
+        processes: int | None = None,
+        stats: Stats | None = None,
+    ) -> list[list[str]]:
+        if stats is None and _STATS_HOOK is None:
+            return self._search_many(queries, processes, None)
+
+        current = Stats()
+        start = time.perf_counter()
+        results = self._search_many(queries, processes, current)
+        current.searches += len(results)
+        current.words += sum(map(len, results))
+        current.seconds += time.perf_counter() - start
+        _report('search_many', current, stats, queries=len(results))
+        return results
+
+    def _search_many(
+        self,
+        queries: Iterable[str | tuple[str, str]],
+        processes: int | None,
+        stats: Stats | None,
+    ) -> list[list[str]]:
+        graph = self._get_graph()
+        keys = []
+        answers = {}
+        groups: dict[str, dict[tuple[int, ...], None]] = defaultdict(dict)
+        for query in queries:
+            letters, contains = (query, '') if isinstance(query, str) else query
+            key = _cache_key(letters, contains)
+            keys.append(key)
+            if key in answers:
+                continue
+            cached = self.cache.get(graph, key)
+            if cached is None:
+                rack, contains = key
+                groups[contains][rack] = None
+            else:
+                answers[key] = cached
+                if stats is not None:
+                    stats.cache_hits += 1
+
+        chunks = []
+        for contains, racks in groups.items():
+            size = len(racks) if not processes else -(-len(racks) // processes)
+            ordered = list(racks)
+            for start in range(0, len(ordered), size):
+                chunks.append((contains, ordered[start : start + size]))
+
+        if processes:
+            with _pool(processes, graph) as executor:
+                futures = [executor.submit(_search_group, *chunk) for chunk in chunks]
+                outputs = [future.result() for future in futures]
+        else:
+            outputs = [_search_group(*chunk, graph) for chunk in chunks]
+
+        for (contains, racks), output in zip(chunks, outputs):
+            for rack, results in zip(racks, output):
+                key = rack, contains
+                answers[key] = _sort(results)
+                self.cache.put(graph, key, results)
+
+        return [list(answers[key]) for key in keys]
+
+
+def _read_shared(filename: str | Path, verify: bool = True) -> Graph:
+    # Lexicons whose files have the same contents share one graph.
+    digest = hashlib.sha256(Path(filename).read_bytes()).digest()
+    with _REGISTRY_LOCK:
+        graph = _GRAPHS.get(digest)
+        if graph is None:
+            graph = _GRAPHS[digest] = _read(filename, verify=verify)
+        return graph
+
+
+def register(
+    name: str,
+    filename: str | Path = DAWG_BIN,
+    gaddag: str | Path | None = None,
+    anagrams: str | Path | None = None,
+) -> None:
+    with _REGISTRY_LOCK:
+        _REGISTRY[name] = {'filename': filename, 'gaddag': gaddag, 'anagrams': anagrams}
+        _LEXICONS.pop(name, None)
+
+
+def lexicon(name: str | None = None) -> Dawg:
+    # Registered lexicons are loaded on first use. No name means the graph
+    # from load() with the module-level cache.
+    if name is None:
+        return _default()
+    with _REGISTRY_LOCK:
+        dawg = _LEXICONS.get(name)
+        if dawg is None:
+            if name not in _REGISTRY:
+                raise ValueError(f'unknown lexicon {name!r}')
+            dawg = _LEXICONS[name] = Dawg.load(**_REGISTRY[name])
+        return dawg
+
+
+def _default() -> Dawg:
+    return Dawg(_DAWG, _GADDAG, _ANAGRAMS, _CACHE)
+
+
+def isearch(
+    letters: str,
+    contains: str = '',
+    pattern: str | None = None,
+    min_length: int | None = None,
+    max_length: int | None = None,
+    engine: str = 'dawg',
+    stats: Stats | None = None,
+) -> Iterator[str]:
+    return _default().isearch(
+        letters, contains, pattern, min_length, max_length, engine, stats
+    )
+
 
-        contains_length = len(contains_list)
-        for index in range(contains_length):
-            letter = contains_list[index]
-            if letter in branches:
-                value.append(letter)
-                state = branches[letter]
-                branches = dawg.get(state, {})
+def isearch_ordered(
+    letters: str,
+    contains: str = '',
+    offset: int = 0,
+    limit: int | None = None,
+    after: str | None = None,
+) -> Iterator[str]:
+    return _default().isearch_ordered(letters, contains, offset, limit, after)
+
+
+def search(
+    letters: str,
+    contains: str = '',
+    exact: bool = False,
+    pattern: str | None = None,
+    min_length: int | None = None,
+    max_length: int | None = None,
+    engine: str = 'dawg',
+    score: Mapping[str, int] | None = None,
+    limit: int | None = None,
+    workers: int | None = None,
+    stats: Stats | None = None,
+) -> list[str]:
+    return _default().search(
+        letters,
+        contains,
+        exact,
+        pattern,
+        min_length,
+        max_length,
+        engine,
+        score,
+        limit,
+        workers,
+        stats,
+    )
+
+
+def search_many(
+    queries: Iterable[str | tuple[str, str]],
+    processes: int | None = None,
+    stats: Stats | None = None,
+) -> list[list[str]]:
+    return _default().search_many(queries, processes, stats)
+
+
+def contains(word: str) -> bool:
+    return _default().contains(word)
+
+
+def has_prefix(prefix: str) -> bool:
+    return _default().has_prefix(prefix)
+
+
+def validate_many(words: Iterable[str]) -> list[bool]:
+    return _default().validate_many(words)
+
+
+def _child(graph: Graph, state: int, bit: int) -> int:
+    mask = graph.masks[state]
+    return graph.edges[graph.offsets[state] + (mask & (bit - 1)).bit_count()]
+
+
+_LETTER_INDEXES: dict[int, tuple[int, ...]] = {}
+
+
+def _children(graph: Graph, state: int) -> Iterable[tuple[int, int]]:
+    # Letter indexes and child states of a node, in letter order. The indexes
+    # of each distinct mask are computed once; a DAWG has few distinct masks.
+    letters = graph.masks[state] & LETTERS
+    indexes = _LETTER_INDEXES.get(letters)
+    if indexes is None:
+        indexes = tuple(i for i in range(26) if letters >> i & 1)
+        _LETTER_INDEXES[letters] = indexes
+    position = graph.offsets[state]
+    return zip(indexes, graph.edges[position : position + len(indexes)])
+
+
+def _take(counts: Sequence[int], index: int) -> int:
+    # The tile that plays a letter: the letter itself, else a blank, else -1.
+    if counts[index]:
+        return index
+    if counts[BLANK]:
+        return BLANK
+    return -1
+
+
+def _walk(graph: Graph, word: str, state: int = 0) -> int:
+    # The node reached by spelling word from state, or -1. Engines use it to
+    # place the contains substring.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    for letter in word:
+        bit = BITS.get(letter, 0)
+        mask = masks[state]
+        if not mask & bit:
+            return -1
+        state = edges[offsets[state] + (mask & (bit - 1)).bit_count()]
+    return state
+
+
+def _validate_many(graph: Graph, words: list[str]) -> list[bool]:
+    # Words are checked in sorted order so each one starts from the deepest
+    # state it shares with the previous word. path holds the states along the
+    # part of the previous word that is in the graph.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    results = [False] * len(words)
+    path = [0]
+    previous = ''
+    for index in sorted(range(len(words)), key=words.__getitem__):
+        word = words[index]
+        common = min(len(word), len(path) - 1)
+        while not word.startswith(previous[:common]):
+            common -= 1
+        del path[common + 1 :]
+        state = path[-1]
+        for letter in word[common:]:
+            bit = BITS.get(letter, 0)
+            mask = masks[state]
+            if not mask & bit:
+                state = -1
+                break
+            state = edges[offsets[state] + (mask & (bit - 1)).bit_count()]
+            path.append(state)
+        results[index] = state >= 0 and bool(masks[state] & END)
+        previous = word
+    return results
+
+
+def _order(word: str) -> tuple[int, str]:
+    return -len(word), word
+
+
+def _isearch(
+    graph: Graph,
+    rack: Sequence[int],
+    contains: str,
+    start: tuple[str, int, int] | None = None,
+) -> Iterator[str]:
+    # Depth-first search with an explicit stack rather than nested generators,
+    # so a word is yielded from this frame instead of passing up through one
+    # generator per letter. The current node's fields are locals and its
+    # parents are saved on the stack. matched is the contains automaton state,
+    # or -1 once contains is placed. used is the tile that reached the node.
+    # start resumes below a prefix from _frontier() with the rack left there.
+    # Here and in the other stack engines the child loop and tile choice are
+    # written out rather than calling _children() and _take(): a call per
+    # child costs these loops several percent.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    reach, shortest, longest = graph.reach, graph.shortest, graph.longest
+    annotated = reach is not None
+    value: list[str] = []
+    counts = list(rack)
+    available = sum(bit for bit, count in zip(BITS.values(), counts) if count)
+    stack: list[tuple[int, int, int, int, int, int, int]] = []
+
+    if not all(letter in BITS for letter in contains):
+        return
+
+    contains_length = len(contains)
+    contains_mask = sum(BITS[letter] for letter in set(contains))
+    transitions, starts = _matcher(contains)
+
+    prefix, state, matched = ('', 0, 0 if contains else -1) if start is None else start
+    value.append(prefix)
+    mask = masks[state]
+    children = mask & LETTERS
+    position = offsets[state]
+    tiles = sum(counts)
+    used = emptied = -1
+    if matched < 0 and mask & END:
+        yield prefix
+
+    while True:
+        if children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            if counts[index]:
+                tile = index
+                emptying = bit if counts[index] == 1 else 0
+            elif counts[BLANK]:
+                tile = BLANK
+                emptying = 0
             else:
-                for _ in range(index):
-                    value.pop()
-                return
+                continue
+
+            if matched < 0:
+                # Skip children whose shortest ending needs more tiles than
+                # are left or whose endings use none of the remaining letters.
+                if annotated and (
+                    shortest[child] >= tiles
+                    or (
+                        shortest[child]
+                        and not counts[BLANK] - (tile == BLANK)
+                        and not reach[child] & (available ^ emptying)
+                    )
+                ):
+                    continue
+                following = -1
+            else:
+                following = transitions[matched][index]
+                if following == contains_length:
+                    continue
+
+                # Skip children that cannot still fit the contains substring.
+                if annotated and (
+                    shortest[child] >= tiles + contains_length
+                    or longest[child] < contains_length
+                    or reach[child] & contains_mask != contains_mask
+                ):
+                    continue
+
+            counts[tile] -= 1
+            available ^= emptying
+            value.append(ALPHABET[index])
+            stack.append((state, children, position, matched, tiles, used, emptied))
+
+            state = child
+            mask = masks[state]
+            children = mask & LETTERS
+            position = offsets[state]
+            matched = following
+            tiles -= 1
+            used = tile
+            emptied = emptying
+            if matched < 0 and mask & END:
+                yield ''.join(value)
+            continue
+
+        if matched >= 0:
+            # The children are done, so place contains here if it can start.
+            anchor = starts[matched]
+            matched = -1
+            if not anchor:
+                continue
+
+            target = _walk(graph, contains, state)
+            if target >= 0:
+                value.append(contains)
+                stack.append((state, children, position, matched, tiles, used, emptied))
+
+                state = target
+                mask = masks[state]
+                children = mask & LETTERS
+                position = offsets[state]
+                used = emptied = -1
+                if mask & END:
+                    yield ''.join(value)
+            continue
+
+        if not stack:
+            return
+        value.pop()
+        if used >= 0:
+            counts[used] += 1
+            available ^= emptied
+        state, children, position, matched, tiles, used, emptied = stack.pop()
+
+
+def _isearch_counted(
+    graph: Graph,
+    rack: Sequence[int],
+    contains: str,
+    start: tuple[str, int, int] | None,
+    stats: Stats,
+) -> Iterator[str]:
+    # _isearch() with the nodes, edges, blanks and pruned counters. It is a
+    # separate copy so that searches without stats do not pay for counting;
+    # keep the two in step.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    reach, shortest, longest = graph.reach, graph.shortest, graph.longest
+    annotated = reach is not None
+    value: list[str] = []
+    counts = list(rack)
+    available = sum(bit for bit, count in zip(BITS.values(), counts) if count)
+    stack: list[tuple[int, int, int, int, int, int, int]] = []
+
+    if not all(letter in BITS for letter in contains):
+        return
+
+    contains_length = len(contains)
+    contains_mask = sum(BITS[letter] for letter in set(contains))
+    transitions, starts = _matcher(contains)
+
+    prefix, state, matched = ('', 0, 0 if contains else -1) if start is None else start
+    value.append(prefix)
+    mask = masks[state]
+    children = mask & LETTERS
+    position = offsets[state]
+    tiles = sum(counts)
+    used = emptied = -1
+    nodes = tried = blanks = pruned = 0
+    if matched < 0 and mask & END:
+        yield prefix
+
+    while True:
+        if children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            if counts[index]:
+                tile = index
+                emptying = bit if counts[index] == 1 else 0
+            elif counts[BLANK]:
+                tile = BLANK
+                emptying = 0
+                blanks += 1
+            else:
+                continue
+
+            if matched < 0:
+                # Skip children whose shortest ending needs more tiles than
+                # are left or whose endings use none of the remaining letters.
+                if annotated and (
+                    shortest[child] >= tiles
+                    or (
+                        shortest[child]
+                        and not counts[BLANK] - (tile == BLANK)
+                        and not reach[child] & (available ^ emptying)
+                    )
+                ):
+                    pruned += 1
+                    continue
+                following = -1
+            else:
+                following = transitions[matched][index]
+                if following == contains_length:
+                    continue
+
+                # Skip children that cannot still fit the contains substring.
+                if annotated and (
+                    shortest[child] >= tiles + contains_length
+                    or longest[child] < contains_length
+                    or reach[child] & contains_mask != contains_mask
+                ):
+                    pruned += 1
+                    continue
+
+            nodes += 1
+            counts[tile] -= 1
+            available ^= emptying
+            value.append(ALPHABET[index])
+            stack.append((state, children, position, matched, tiles, used, emptied))
+
+            state = child
+            mask = masks[state]
+            children = mask & LETTERS
+            tried += children.bit_count()
+            position = offsets[state]
+            matched = following
+            tiles -= 1
+            used = tile
+            emptied = emptying
+            if matched < 0 and mask & END:
+                yield ''.join(value)
+            continue
+
+        if matched >= 0:
+            # The children are done, so place contains here if it can start.
+            anchor = starts[matched]
+            matched = -1
+            if not anchor:
+                continue
+
+            target = _walk(graph, contains, state)
+            if target >= 0:
+                value.append(contains)
+                stack.append((state, children, position, matched, tiles, used, emptied))
+
+                state = target
+                mask = masks[state]
+                children = mask & LETTERS
+                position = offsets[state]
+                used = emptied = -1
+                if mask & END:
+                    yield ''.join(value)
+            continue
+
+        if not stack:
+            stats.nodes += nodes
+            stats.edges += tried
+            stats.blanks += blanks
+            stats.pruned += pruned
+            return
+        value.pop()
+        if used >= 0:
+            counts[used] += 1
+            available ^= emptied
+        state, children, position, matched, tiles, used, emptied = stack.pop()
+
+
+def _frontier(
+    graph: Graph, rack: Sequence[int], contains: str, depth: int
+) -> tuple[list[str], list[tuple[tuple[int, ...], tuple[str, int, int]]]]:
+    # Split a search into the words above the given depth and, for each node
+    # at that depth, the rack left and the _isearch() start below it. Placing
+    # contains counts as one step, like a letter.
+    masks = graph.masks
+    value: list[str] = []
+    counts = list(rack)
+    words: list[str] = []
+    tasks: list[tuple[tuple[int, ...], tuple[str, int, int]]] = []
+
+    if not all(letter in BITS for letter in contains):
+        return words, tasks
+
+    contains_length = len(contains)
+    transitions, starts = _matcher(contains)
+
+    def visit(state: int, matched: int, remaining: int) -> None:
+        mask = masks[state]
+        if not remaining:
+            tasks.append((tuple(counts), (''.join(value), state, matched)))
+            return
+        if matched < 0 and mask & END:
+            words.append(''.join(value))
+
+        for index, child in _children(graph, state):
+            used = _take(counts, index)
+            if used < 0:
+                continue
 
-        yield from helper(state, True)
+            following = -1 if matched < 0 else transitions[matched][index]
+            if following == contains_length:
+                continue
 
-        for _ in range(contains_length):
+            counts[used] -= 1
+            value.append(ALPHABET[index])
+            visit(child, following, remaining - 1)
             value.pop()
+            counts[used] += 1
 
-    def traverse(state: str, contained: bool) -> Iterator[str]:
-        branches = dawg.get(state, {})
-        letters_length = len(letters_list)
+        if matched < 0 or not starts[matched]:
+            return
 
-        for _ in range(letters_length):
-            letter = letters_list.pop(0)
-            choices = ALPHABET if letter == '?' else (letter,)
+        state = _walk(graph, contains, state)
+        if state < 0:
+            return
 
-            for choice in choices:
-                if choice in branches:
-                    value.append(choice)
-                    yield from helper(branches[choice], contained)
-                    value.pop()
+        value.append(contains)
+        visit(state, -1, remaining - 1)
+        value.pop()
+
+    visit(0, 0 if contains else -1, depth)
+    return words, tasks
+
+
+def _search_branches(
+    contains: str,
+    tasks: list[tuple[tuple[int, ...], tuple[str, int, int]]],
+    graph: Graph | None = None,
+) -> list[str]:
+    if graph is None:
+        graph = _get_dawg()
+    return [
+        word for rack, start in tasks for word in _isearch(graph, rack, contains, start)
+    ]
+
+
+def _search_parallel(
+    graph: Graph, rack: Sequence[int], contains: str, workers: int
+) -> list[str]:
+    # Subtrees below the first two letters are independent and only read the
+    # graph. They are dealt round robin into a few chunks per worker so that
+    # heavy prefixes spread out. Threads share the graph when the GIL is
+    # disabled; otherwise forked processes share its pages.
+    words, tasks = _frontier(graph, rack, contains, SPLIT_DEPTH)
+    size = min(len(tasks), 4 * workers)
+    chunks = [tasks[index::size] for index in range(size)]
+
+    if not getattr(sys, '_is_gil_enabled', lambda: True)():
+        with _pool(workers, graph, threads=True) as executor:
+            futures = [
+                executor.submit(_search_branches, contains, chunk, graph)
+                for chunk in chunks
+            ]
+            for future in futures:
+                words.extend(future.result())
+    else:
+        with _pool(workers, graph) as executor:
+            for output in executor.map(_search_branches, [contains] * size, chunks):
+                words.extend(output)
+
+    return _sort(words)
+
+
+def _search_longest(
+    graph: Graph,
+    rack: Sequence[int],
+    contains: str,
+    limit: int,
+    after: str | None,
+) -> list[str]:
+    # The first limit words in search() order that come after the cursor, on
+    # the explicit stack of _isearch(). Once limit words are found, a child is
+    # skipped when its longest ending, or the tiles left that some ending
+    # below it can use, cannot reach the shortest of them. A cursor caps the
+    # length at len(after). Fewer than limit words means all were found.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    reach, shortest, longest = graph.reach, graph.shortest, graph.longest
+    annotated = reach is not None
+    value: list[str] = []
+    counts = list(rack)
+    available = sum(bit for bit, count in zip(BITS.values(), counts) if count)
+    found: list[str] = []
+    stack: list[tuple[int, int, int, int, int, int, int]] = []
+
+    if not all(letter in BITS for letter in contains) or limit == 0:
+        return []
+
+    contains_length = len(contains)
+    contains_mask = sum(BITS[letter] for letter in set(contains))
+    transitions, starts = _matcher(contains)
+    # Without contains, words are found in alphabetical order, so a word that
+    # only ties the last of the limit words on length ranks below it.
+    strict = 0 if contains else 1
+    tiles = size = sum(counts)
+    high = len(after) if after is not None else size + contains_length
+    # The number of words found of each length. The last of the first limit
+    # words is cut long, and kept words are at least cut long.
+    lengths = [0] * (high + 1)
+    cut = kept = need = 0
+
+    def record(length: int) -> None:
+        nonlocal cut, kept, need
+        word = ''.join(value)
+        if after is not None and _order(word) <= _order(after):
+            return
+        found.append(word)
+        lengths[length] += 1
+        kept += 1
+        while kept - lengths[cut] >= limit:
+            kept -= lengths[cut]
+            cut += 1
+        if kept >= limit:
+            need = cut + strict
+
+    state, matched = 0, 0 if contains else -1
+    mask = masks[state]
+    children = mask & LETTERS
+    position = offsets[state]
+    used = emptied = -1
+
+    while True:
+        if children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            if counts[index]:
+                tile = index
+                emptying = bit if counts[index] == 1 else 0
+            elif counts[BLANK]:
+                tile = BLANK
+                emptying = 0
+            else:
+                continue
+
+            if matched < 0:
+                if annotated and (
+                    shortest[child] >= tiles
+                    or (
+                        shortest[child]
+                        and not counts[BLANK] - (tile == BLANK)
+                        and not reach[child] & (available ^ emptying)
+                    )
+                ):
+                    continue
+                following = -1
+                length = size - tiles + 1 + contains_length
+                free = tiles - 1
+                floor = shortest[child] if annotated else 0
+            else:
+                following = transitions[matched][index]
+                if following == contains_length:
+                    continue
+                if annotated and (
+                    shortest[child] >= tiles + contains_length
+                    or longest[child] < contains_length
+                    or reach[child] & contains_mask != contains_mask
+                ):
+                    continue
+                length = size - tiles + 1
+                free = tiles - 1 + contains_length
+                floor = max(shortest[child], contains_length) if annotated else 0
+
+            if length + floor > high:
+                continue
+            if need and annotated:
+                if length + longest[child] < need:
+                    continue
+                # Tiles for letters that are in no ending below the child
+                # cannot lengthen a word through it.
+                unusable = (available ^ emptying) & ~reach[child]
+                while unusable and length + free >= need:
+                    spent = unusable & -unusable
+                    unusable ^= spent
+                    letter = spent.bit_length() - 1
+                    free -= counts[letter] - (letter == tile)
+                if length + free < need:
+                    continue
+
+            counts[tile] -= 1
+            available ^= emptying
+            value.append(ALPHABET[index])
+            stack.append((state, children, position, matched, tiles, used, emptied))
+
+            state = child
+            mask = masks[state]
+            children = mask & LETTERS
+            position = offsets[state]
+            matched = following
+            tiles -= 1
+            used = tile
+            emptied = emptying
+            if matched < 0 and mask & END and length >= need:
+                record(length)
+            continue
+
+        if matched >= 0:
+            # The children are done, so place contains here if it can start.
+            anchor = starts[matched]
+            matched = -1
+            if not anchor:
+                continue
+
+            target = _walk(graph, contains, state)
+            if target >= 0:
+                value.append(contains)
+                stack.append((state, children, position, matched, tiles, used, emptied))
+
+                state = target
+                mask = masks[state]
+                children = mask & LETTERS
+                position = offsets[state]
+                used = emptied = -1
+                length = size - tiles + contains_length
+                if mask & END and length <= high and length >= need:
+                    record(length)
+            continue
+
+        if not stack:
+            break
+        value.pop()
+        if used >= 0:
+            counts[used] += 1
+            available ^= emptied
+        state, children, position, matched, tiles, used, emptied = stack.pop()
+
+    return _sort(found)[:limit]
+
+
+def _isearch_gaddag(graph: Graph, rack: Sequence[int], contains: str) -> Iterator[str]:
+    # Start from the reversed contains substring, extend left with rack letters,
+    # then cross the separator and extend right. A KMP automaton over the
+    # reversed prefix rejects paths where contains occurs again to the left,
+    # so each word is anchored at its leftmost occurrence and found once.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    counts = list(rack)
+    left: list[str] = []
+    right: list[str] = []
+
+    if not all(letter in BITS for letter in contains):
+        return
+
+    reverse = contains[::-1]
+    size = len(reverse)
+    transitions, _ = _matcher(reverse)
+    # After a full match, continue from the longest proper border.
+    border = next(
+        end for end in range(size - 1, -1, -1) if reverse.endswith(reverse[:end])
+    )
+    transitions.append(transitions[border])
+
+    state = _walk(graph, reverse)
+    if state < 0:
+        return
+
+    # As in _isearch(), the current node's fields are locals and its parents
+    # are on the stack. matched is the automaton state while extending left
+    # and -1 once the separator is crossed. side says how the node was
+    # reached: 0 across the separator, 1 by a left letter, 2 by a right one.
+    stack: list[tuple[int, int, int, int, int, int]] = []
+    children = masks[state] & (LETTERS | SEPARATOR)
+    position = offsets[state]
+    matched = size
+    used = side = -1
+
+    while True:
+        if children & SEPARATOR:
+            children ^= SEPARATOR
+            child = _child(graph, state, SEPARATOR)
+            following = tile = -1
+            step = 0
+        elif children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            following = -1 if matched < 0 else transitions[matched][index]
+            if following == size:
+                continue
+
+            if counts[index]:
+                tile = index
+            elif counts[BLANK]:
+                tile = BLANK
+            else:
+                continue
 
-            letters_list.append(letter)
+            counts[tile] -= 1
+            if matched < 0:
+                right.append(ALPHABET[index])
+                step = 2
+            else:
+                left.append(ALPHABET[index])
+                step = 1
+        else:
+            if not stack:
+                return
+            if side == 1:
+                left.pop()
+            elif side == 2:
+                right.pop()
+            if used >= 0:
+                counts[used] += 1
+            state, children, position, matched, used, side = stack.pop()
+            continue
+
+        stack.append((state, children, position, matched, used, side))
+        state = child
+        mask = masks[state]
+        matched = following
+        used = tile
+        side = step
+        position = offsets[state]
+        if matched < 0:
+            children = mask & LETTERS
+            if mask & END:
+                yield ''.join(reversed(left)) + contains + ''.join(right)
+        else:
+            children = mask & (LETTERS | SEPARATOR)
+
+
+def _isearch_pattern(
+    graph: Graph, rack: Sequence[int], pattern: str, min_length: int, max_length: int
+) -> Iterator[str]:
+    # Letters fixed by the pattern are already on the board and use no tiles.
+    # Open slots, including every position past the end of the pattern, are
+    # filled from the rack.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    shortest, longest = graph.shortest, graph.longest
+    annotated = shortest is not None
+    value: list[str] = []
+    counts = list(rack)
+    fixed = [BITS.get(letter, 0) for letter in pattern]
+    fixed += [0] * (max_length - len(fixed) + 1)
+    needed = [0] * (max(min_length, 0) + 1)
+    for depth in reversed(range(min_length)):
+        needed[depth] = needed[depth + 1] + (not fixed[depth])
+
+    def fits(child: int, depth: int, tiles: int) -> bool:
+        # Skip children without enough tiles for the open slots up to
+        # min_length, or whose endings are all too short or too long.
+        if depth < min_length and needed[depth] > tiles:
+            return False
+        return not annotated or (
+            depth + shortest[child] <= max_length
+            and depth + longest[child] >= min_length
+        )
+
+    if min_length > max_length:
+        return
+
+    # The same explicit stack as _isearch(). used is the tile that reached the
+    # node, or -1 for a letter fixed by the pattern. entering is set when the
+    # current node's children still need to be set up.
+    stack: list[tuple[int, int, int, int, int]] = []
+    state = depth = 0
+    tiles = sum(counts)
+    used = -1
+    entering = True
+    if masks[state] & END and depth >= min_length:
+        yield ''
+
+    while True:
+        if entering:
+            entering = False
+            mask = masks[state]
+            slot = fixed[depth]
+            if depth == max_length:
+                children = 0
+            elif slot:
+                children = mask & slot
+                position = offsets[state] + (mask & (slot - 1)).bit_count()
+            else:
+                children = mask & LETTERS
+                position = offsets[state]
+
+        if children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            if fixed[depth]:
+                tile, left = -1, tiles
+            elif counts[index]:
+                tile, left = index, tiles - 1
+            elif counts[BLANK]:
+                tile, left = BLANK, tiles - 1
+            else:
+                continue
+
+            if not fits(child, depth + 1, left):
+                continue
+
+            if tile >= 0:
+                counts[tile] -= 1
+            value.append(ALPHABET[index])
+            stack.append((state, children, position, tiles, used))
+            state = child
+            depth += 1
+            tiles = left
+            used = tile
+            entering = True
+            if masks[state] & END and depth >= min_length:
+                yield ''.join(value)
+            continue
+
+        if not stack:
+            return
+        value.pop()
+        if used >= 0:
+            counts[used] += 1
+        state, children, position, tiles, used = stack.pop()
+        depth -= 1
+
+
+def _score_bounds(graph: Graph, values: tuple[int, ...]) -> array:
+    # The highest letter value total of any ending below each node. Bounds
+    # are computed once per graph and letter value table. Entries keep their
+    # graph so a reused id() cannot match.
+    key = id(graph), values
+    with _BOUNDS_LOCK:
+        entry = _BOUNDS.get(key)
+        if entry is not None and entry[0] is graph:
+            _BOUNDS.move_to_end(key)
+            return entry[1]
+
+    bounds = array('q', [0]) * len(graph.masks)
+    for state in _postorder(graph):
+        high = 0
+        for index, child in _children(graph, state):
+            score = values[index] + bounds[child]
+            if score > high:
+                high = score
+        bounds[state] = high
+
+    with _BOUNDS_LOCK:
+        _BOUNDS[key] = graph, bounds
+        while len(_BOUNDS) > 8:
+            _BOUNDS.popitem(last=False)
+    return bounds
+
+
+def _search_scored(
+    graph: Graph,
+    rack: Sequence[int],
+    contains: str,
+    values: tuple[int, ...],
+    limit: int | None,
+) -> list[str]:
+    # The explicit stack of _isearch() with a score bound. A child is skipped
+    # once it cannot beat the k-th best word so far on score, or on length
+    # when the score would tie. The bound is the lesser of the best ending
+    # below the child and the value of the tiles left. Blanks score zero and
+    # contains letters score face value. total is the score of the path, and
+    # like the other node fields it is saved on the stack.
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    reach, shortest, longest = graph.reach, graph.shortest, graph.longest
+    annotated = reach is not None
+    bounds = _score_bounds(graph, values)
+    value: list[str] = []
+    counts = list(rack)
+    available = sum(bit for bit, count in zip(BITS.values(), counts) if count)
+    found: list[tuple[int, str]] = []
+    best: list[tuple[int, int, tuple[int, ...], str]] = []
+    low_score = low_length = 0
+    stack: list[tuple[int, int, int, int, int, int, int, int]] = []
+
+    if not all(letter in BITS for letter in contains) or limit == 0:
+        return []
+
+    contains_length = len(contains)
+    contains_value = sum(values[ord(letter) - ord('a')] for letter in contains)
+    contains_mask = sum(BITS[letter] for letter in set(contains))
+    transitions, starts = _matcher(contains)
+    # Without contains, words are found in alphabetical order, so a word that
+    # only ties the k-th best on score and length ranks below it.
+    strict = 0 if contains else 1
+
+    def record(total: int, length: int) -> None:
+        nonlocal low_score, low_length
+        word = ''.join(value)
+        if limit is None:
+            found.append((total, word))
+            return
+        # The heap's smallest key is the worst of the best k words.
+        key = (total, length, tuple(map(operator.neg, word.encode())), word)
+        if len(best) < limit:
+            heapq.heappush(best, key)
+        else:
+            heapq.heappushpop(best, key)
+        if len(best) == limit:
+            low_score, low_length, _, _ = best[0]
+
+    state, matched = 0, 0 if contains else -1
+    mask = masks[state]
+    children = mask & LETTERS
+    position = offsets[state]
+    tiles = size = sum(counts)
+    spare = sum(map(operator.mul, values, counts))
+    total = 0
+    used = emptied = -1
+
+    while True:
+        if children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            if counts[index]:
+                tile = index
+                gain = values[index]
+                emptying = bit if counts[index] == 1 else 0
+            elif counts[BLANK]:
+                tile = BLANK
+                gain = emptying = 0
+            else:
+                continue
+
+            if matched < 0:
+                bound = total + gain + min(bounds[child], spare - gain)
+                if bound < low_score:
+                    continue
+                if annotated and (
+                    shortest[child] >= tiles
+                    or (
+                        shortest[child]
+                        and not counts[BLANK] - (tile == BLANK)
+                        and not reach[child] & (available ^ emptying)
+                    )
+                    or (
+                        bound == low_score
+                        and size - tiles + contains_length + 1 + longest[child]
+                        < low_length + strict
+                    )
+                ):
+                    continue
+                following = -1
+            else:
+                following = transitions[matched][index]
+                if following == contains_length:
+                    continue
+                extra = spare - gain + contains_value
+                if total + gain + min(bounds[child], extra) < low_score:
+                    continue
+                if annotated and (
+                    shortest[child] >= tiles + contains_length
+                    or longest[child] < contains_length
+                    or reach[child] & contains_mask != contains_mask
+                ):
+                    continue
+
+            counts[tile] -= 1
+            available ^= emptying
+            value.append(ALPHABET[index])
+            stack.append(
+                (state, children, position, matched, tiles, used, emptied, total)
+            )
+
+            state = child
+            mask = masks[state]
+            children = mask & LETTERS
+            position = offsets[state]
+            matched = following
+            tiles -= 1
+            used = tile
+            emptied = emptying
+            total += gain
+            spare -= gain
+            if matched < 0 and mask & END:
+                length = size - tiles + contains_length
+                if total > low_score or (
+                    total == low_score and length >= low_length + strict
+                ):
+                    record(total, length)
+            continue
+
+        if matched >= 0:
+            # The children are done, so place contains here if it can start.
+            anchor = starts[matched]
+            matched = -1
+            if not anchor:
+                continue
+
+            target = _walk(graph, contains, state)
+            if target >= 0:
+                value.append(contains)
+                stack.append(
+                    (state, children, position, matched, tiles, used, emptied, total)
+                )
+
+                state = target
+                mask = masks[state]
+                children = mask & LETTERS
+                position = offsets[state]
+                used = emptied = -1
+                total += contains_value
+                length = size - tiles + contains_length
+                if mask & END and (
+                    total > low_score
+                    or (total == low_score and length >= low_length + strict)
+                ):
+                    record(total, length)
+            continue
+
+        if not stack:
+            break
+        value.pop()
+        if used >= 0:
+            counts[used] += 1
+            available ^= emptied
+            if used != BLANK:
+                spare += values[used]
+        state, children, position, matched, tiles, used, emptied, total = stack.pop()
+
+    if limit is not None:
+        return [key[3] for key in sorted(best, reverse=True)]
+    found.sort(key=lambda item: (-item[0], -len(item[1]), item[1]))
+    return [word for _, word in found]
+
+
+def _search_group(
+    contains: str, racks: list[tuple[int, ...]], graph: Graph | None = None
+) -> list[list[str]]:
+    # Walk the graph once for every rack sharing ``contains``. Each node keeps
+    # the racks that can still spell the path to it. Worker processes search
+    # the graph they were started with. The child loops are written out as in
+    # _isearch().
+    if graph is None:
+        graph = _get_dawg()
+    masks, offsets, edges = graph.masks, graph.offsets, graph.edges
+    reach, shortest, longest = graph.reach, graph.shortest, graph.longest
+    annotated = reach is not None
+    value: list[str] = []
+    counts = [list(rack) for rack in racks]
+    totals = [sum(rack) for rack in racks]
+    results: list[list[str]] = [[] for _ in racks]
+
+    if not all(letter in BITS for letter in contains):
+        return results
+
+    contains_length = len(contains)
+    contains_mask = sum(BITS[letter] for letter in set(contains))
+    transitions, starts = _matcher(contains)
+
+    def spend(index: int, active: list[int]) -> list[tuple[int, int]]:
+        spent = []
+        for rack in active:
+            rack_counts = counts[rack]
+            if rack_counts[index]:
+                spent.append((rack, index))
+            elif rack_counts[BLANK]:
+                spent.append((rack, BLANK))
+        return spent
+
+    def helper(state: int, placed: int, active: list[int]) -> None:
+        if masks[state] & END:
+            word = ''.join(value)
+            for rack in active:
+                results[rack].append(word)
+
+        children = masks[state] & LETTERS
+        position = offsets[state]
+        while children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            spent = spend(index, active)
+            if annotated:
+                spent = [
+                    (rack, used)
+                    for rack, used in spent
+                    if shortest[child] < totals[rack] - placed
+                ]
+            if not spent:
+                continue
+
+            for rack, used in spent:
+                counts[rack][used] -= 1
+            value.append(ALPHABET[index])
+            helper(child, placed + 1, [rack for rack, _ in spent])
+            value.pop()
+            for rack, used in spent:
+                counts[rack][used] += 1
+
+    def traverse(state: int, matched: int, placed: int, active: list[int]) -> None:
+        children = masks[state] & LETTERS
+        position = offsets[state]
+        while children:
+            bit = children & -children
+            children ^= bit
+            index = bit.bit_length() - 1
+            child = edges[position]
+            position += 1
+
+            following = transitions[matched][index]
+            if following == contains_length:
+                continue
+
+            if annotated and (
+                longest[child] < contains_length
+                or reach[child] & contains_mask != contains_mask
+            ):
+                continue
+
+            spent = spend(index, active)
+            if annotated:
+                spent = [
+                    (rack, used)
+                    for rack, used in spent
+                    if shortest[child] < totals[rack] - placed + contains_length
+                ]
+            if not spent:
+                continue
+
+            for rack, used in spent:
+                counts[rack][used] -= 1
+            value.append(ALPHABET[index])
+            traverse(child, following, placed + 1, [rack for rack, _ in spent])
+            value.pop()
+            for rack, used in spent:
+                counts[rack][used] += 1
 
-    yield from helper('0', not contains_list)
+        if not starts[matched]:
+            return
 
+        state = _walk(graph, contains, state)
+        if state < 0:
+            return
 
-def search(letters: str, contains: str = '') -> list[str]:
-    results = list(isearch(letters, contains))
-    results.sort(key=lambda word: (-len(word), word))
+        value.append(contains)
+        helper(state, placed, active)
+        value.pop()
+
+    everyone = list(range(len(racks)))
+    if contains:
+        traverse(0, 0, 0, everyone)
+    else:
+        helper(0, 0, everyone)
     return results
 
 
+def _portable(graph: Graph) -> Graph:
+    return Graph(
+        *(
+            values
+            if values is None or isinstance(values, array)
+            else array(values.format, values)
+            for values in graph
+        )
+    )
+
+
+def _set_dawg(graph: Graph, registry: dict | None = None) -> None:
+    global _DAWG
+    _DAWG = graph
+    if registry:
+        _REGISTRY.update(registry)
+
+
+def _executor(
+    processes: int | None = None, graph: Graph | None = None
+) -> ProcessPoolExecutor:
+    # On Linux, forked workers inherit the graph and the loaded lexicons and
+    # share their pages. Elsewhere forking is unsafe (macOS system frameworks)
+    # or unavailable, so the platform's default start method is used and each
+    # worker receives its own copy of the graph and loads registered lexicons
+    # when first asked for them.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if graph is None:
+        graph = _get_dawg()
+    if sys.platform == 'linux':
+        context = multiprocessing.get_context('fork')
+        return ProcessPoolExecutor(
+            processes, mp_context=context, initializer=_set_dawg, initargs=(graph,)
+        )
+    return ProcessPoolExecutor(
+        processes,
+        initializer=_set_dawg,
+        initargs=(_portable(graph), dict(_REGISTRY)),
+    )
+
+
+@contextmanager
+def _pool(workers: int, graph: Graph, threads: bool = False) -> Iterator[Executor]:
+    # Pools are kept for reuse because starting one costs more than most
+    # searches. Process workers hold the graph they were started with, so
+    # process pools are kept per graph; entries keep their graph so a reused
+    # id() cannot match. The least recently used pools past the first four
+    # are dropped, and a dropped pool is shut down once its last user is done.
+    key = 0 if threads else id(graph), workers
+    with _POOLS_LOCK:
+        entry = _POOLS.get(key)
+        if entry is None:
+            if threads:
+                from concurrent.futures import ThreadPoolExecutor
+
+                entry = None, ThreadPoolExecutor(workers)
+            else:
+                entry = graph, _executor(workers, graph)
+            _POOLS[key] = entry
+            while len(_POOLS) > 4:
+                _, (_, dropped) = _POOLS.popitem(last=False)
+                if dropped not in _POOL_USERS:
+                    dropped.shutdown(wait=False)
+        else:
+            _POOLS.move_to_end(key)
+        executor = entry[1]
+        _POOL_USERS[executor] = _POOL_USERS.get(executor, 0) + 1
+
+    try:
+        yield executor
+    finally:
+        with _POOLS_LOCK:
+            _POOL_USERS[executor] -= 1
+            if not _POOL_USERS[executor]:
+                del _POOL_USERS[executor]
+                if all(executor is not kept for _, kept in _POOLS.values()):
+                    executor.shutdown(wait=False)
+
+
+def _shutdown_pools() -> None:
+    with _POOLS_LOCK:
+        for _, executor in _POOLS.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _POOLS.clear()
+
+
 def make_dawg(
-    filename: str | Path = WEBSITE_DAWG_JS, words_filename: str | Path = WORDS_TXT
+    filename: str | Path = WEBSITE_DAWG_BIN,
+    words_filename: str | Path = WORDS_TXT,
+    binary: str | Path | None = None,
+    incremental: bool = False,
+    processes: int | None = None,
+    stats: Stats | None = None,
 ):
-    words = load_words(words_filename=words_filename)
-    data = build_dawg(words)
-    _write_dawg(data, filename=filename)
+    with _phase(stats, 'load_words'):
+        words = load_words(words_filename=words_filename)
+    if incremental and binary is not None and Path(binary).exists():
+        with _phase(stats, 'update_dawg'):
+            data = expand(_read(binary))
+            previous = set(iter_words(data))
+            current = set(words)
+            data = update_dawg(
+                data, add=sorted(current - previous), remove=sorted(previous - current)
+            )
+    else:
+        with _phase(stats, 'build_dawg'):
+            data = build_dawg(words, processes=processes)
+    with _phase(stats, 'write_website_dawg'):
+        _write_website_dawg(data, filename=filename)
+    if binary is not None:
+        with _phase(stats, 'write_binary'):
+            _write_dawg_bin(annotate(compact(data)), filename=binary)
     return data
 
 
+def _compress(path: Path) -> None:
+    # Siblings for nginx gzip_static; mtime=0 keeps rebuilds byte-identical.
+    data = path.read_bytes()
+    Path(f'{path}.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        Path(f'{path}.br').write_bytes(brotli.compress(data))
+
+
+def make_assets(
+    directory: str | Path = WEBSITE_DIR,
+    names: Iterable[str] = ASSETS,
+    manifest_filename: str | Path | None = MANIFEST_JSON,
+    dawg: str | Path | None = None,
+) -> dict[str, str]:
+    # dawg is the graph to publish as dawg.bin when it was written somewhere
+    # other than the directory. Hashed copies always go in the directory.
+    directory = Path(directory)
+    manifest = {}
+
+    for name in names:
+        source = directory / name
+        if dawg is not None and name == WEBSITE_DAWG_BIN.name:
+            source = Path(dawg)
+        data = source.read_bytes()
+        code = hashlib.sha256(data).hexdigest()[:16]
+        stem, suffix = Path(name).stem, Path(name).suffix
+        target = directory / f'{stem}.{code}{suffix}'
+        target.write_bytes(data)
+        _compress(target)
+        manifest[f'/{name}'] = f'/{target.name}'
+
+        pattern = re.compile(
+            rf'{re.escape(stem)}\.[0-9a-f]{{16}}{re.escape(suffix)}'
+            r'(\.gz|\.br)?'
+        )
+        for path in directory.iterdir():
+            stale = not path.name.startswith(target.name)
+            if stale and pattern.fullmatch(path.name):
+                path.unlink()
+
+    if manifest_filename is not None:
+        text = json.dumps(manifest, indent=4, sort_keys=True) + '\n'
+        Path(manifest_filename).write_text(text, encoding='utf-8')
+    return manifest
+
+
+def make_index(
+    manifest: dict[str, str],
+    filename: str | Path = INDEX_HTML,
+    template_filename: str | Path = INDEX_TEMPLATE_HTML,
+) -> str:
+    text = Path(template_filename).read_text(encoding='utf-8')
+    for name, url in manifest.items():
+        text = text.replace(f'{{{name}}}', url)
+    text = text.replace('{MANIFEST}', json.dumps(manifest, sort_keys=True))
+
+    path = Path(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    _compress(path)
+    return text
+
+
 def make_service_worker(
     filename: str | Path = 'www/service-worker.js',
     template_filename: str | Path = SERVICE_WORKER_JS,
     hash_filenames: Iterable[str | Path] | None = None,
+    manifest: dict[str, str] | None = None,
 ) -> str:
     if hash_filenames is None:
-        hash_filenames = [INDEX_HTML, MAIN_JS, STYLES_CSS, WORDS_TXT, template_filename]
+        hash_filenames = [INDEX_HTML, WORDS_TXT, template_filename]
+    if manifest is None:
+        manifest = {f'/{name}': f'/{name}' for name in ASSETS}
 
     sha2 = hashlib.sha256()
     for hash_filename in hash_filenames:
@@ -246,29 +2788,77 @@ def make_service_worker(
     code = sha2.hexdigest()[:16]
     text = Path(template_filename).read_text(encoding='utf-8')
     text = text.replace('{HASH}', code)
+    assets = ['/', *sorted(manifest.values())]
+    text = text.replace('{ASSETS}', json.dumps(assets, indent=4).replace('"', "'"))
 
     path = Path(filename)
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(text, encoding='utf-8')
+    _compress(path)
     return code
 
 
 def build(
-    dawg: str | Path = WEBSITE_DAWG_JS,
+    dawg: str | Path = WEBSITE_DAWG_BIN,
     package_dawg: str | Path = DAWG_JS,
+    package_binary: str | Path = DAWG_BIN,
+    anagrams: str | Path | None = ANAGRAMS_TXT,
     service_worker: str | Path = 'www/service-worker.js',
     words_filename: str | Path = WORDS_TXT,
     template_filename: str | Path = SERVICE_WORKER_JS,
     hash_filenames: Iterable[str | Path] | None = None,
+    incremental: bool = False,
+    assets: str | Path | None = WEBSITE_DIR,
+    index: str | Path = INDEX_HTML,
+    index_template_filename: str | Path = INDEX_TEMPLATE_HTML,
+    gaddag: str | Path | None = None,
+    processes: int | None = None,
+    stats: Stats | None = None,
 ) -> tuple[dict[str, dict[str, str]], str]:
-    data = make_dawg(filename=dawg, words_filename=words_filename)
-    if Path(package_dawg) != Path(dawg):
-        _write_dawg(data, filename=package_dawg)
-    code = make_service_worker(
-        filename=service_worker,
-        template_filename=template_filename,
-        hash_filenames=hash_filenames,
+    if assets is not None and Path(dawg).suffix == '.js':
+        raise ValueError('website assets need a binary DAWG; pass assets=None for .js')
+    current = Stats() if stats is not None or _STATS_HOOK is not None else None
+    start = time.perf_counter()
+    data = make_dawg(
+        filename=dawg,
+        words_filename=words_filename,
+        binary=package_binary,
+        incremental=incremental,
+        processes=processes,
+        stats=current,
     )
+    if Path(package_dawg) != Path(dawg):
+        with _phase(current, 'write_dawg_js'):
+            _write_dawg(data, filename=package_dawg)
+    if anagrams is not None or gaddag is not None:
+        words = load_words(words_filename=words_filename)
+    if anagrams is not None:
+        with _phase(current, 'anagrams'):
+            _write_anagrams(build_anagrams(words), filename=anagrams)
+    if gaddag is not None:
+        with _phase(current, 'gaddag'):
+            _write_dawg_bin(compact(build_gaddag(words)), filename=gaddag)
+    manifest = None
+    if assets is not None:
+        with _phase(current, 'assets'):
+            manifest = make_assets(
+                directory=assets,
+                manifest_filename=Path(assets) / 'manifest.json',
+                dawg=dawg,
+            )
+            make_index(
+                manifest, filename=index, template_filename=index_template_filename
+            )
+    with _phase(current, 'service_worker'):
+        code = make_service_worker(
+            filename=service_worker,
+            template_filename=template_filename,
+            hash_filenames=hash_filenames,
+            manifest=manifest,
+        )
+    if current is not None:
+        current.seconds += time.perf_counter() - start
+        _report('build', current, stats)
     return data, code
 
 
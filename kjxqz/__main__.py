@@ -1,9 +1,25 @@
 from __future__ import annotations
 
 import argparse
-from typing import Sequence
+import json
+import sys
+from collections import deque
+from itertools import islice
+from typing import Iterable, Iterator, Sequence, TextIO
 
-from . import DAWG_JS, build, load, search
+from . import (
+    DAWG_BIN,
+    Stats,
+    _executor,
+    build,
+    load,
+    load_gaddag,
+    search,
+    search_many,
+    validate_many,
+)
+
+BATCH_SIZE = 256
 
 
 def parse_args(argv: Sequence[str] | None = None):
@@ -13,15 +29,55 @@ def parse_args(argv: Sequence[str] | None = None):
     parser.add_argument(
         '--dawg',
         default=None,
-        help='Path to DAWG JavaScript data.',
+        help='Path to DAWG binary or JavaScript data.',
+    )
+    parser.add_argument(
+        '--gaddag',
+        default=None,
+        help='Path to a GADDAG binary to write on build or to use for searches.',
     )
     parser.add_argument(
         '--service-worker',
         default='www/service-worker.js',
         help='Output path for generated service worker JavaScript.',
     )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Update the existing DAWG with changes to the word list.',
+    )
+    parser.add_argument(
+        '--host', default='127.0.0.1', help='Address for the search service.'
+    )
+    parser.add_argument(
+        '--port', type=int, default=8000, help='Port for the search service.'
+    )
+    parser.add_argument(
+        '--lexicon',
+        action='append',
+        default=[],
+        metavar='NAME=PATH',
+        help='Serve another DAWG as a named lexicon (repeatable).',
+    )
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=None,
+        help=(
+            'Number of worker processes (defaults to the CPU count; batch runs '
+            'in-process unless given more than 1).'
+        ),
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help=('Print search, batch or build counters and timings as JSON to stderr.'),
+    )
     parser.add_argument('args', nargs='*', help='Command and command arguments.')
     namespace = parser.parse_args(argv)
+    for option in namespace.lexicon:
+        if '=' not in option:
+            parser.error('--lexicon expects NAME=PATH')
 
     args = namespace.args
     if not args:
@@ -39,6 +95,34 @@ def parse_args(argv: Sequence[str] | None = None):
         namespace.contains = ''
         return namespace
 
+    if head == 'serve':
+        if len(args) != 1:
+            parser.error('serve takes no positional arguments')
+        if namespace.stats:
+            parser.error('--stats is not supported by serve')
+        namespace.command = 'serve'
+        namespace.letters = ''
+        namespace.contains = ''
+        return namespace
+
+    if head == 'batch':
+        if len(args) != 1:
+            parser.error('batch reads queries from stdin and takes no arguments')
+        namespace.command = 'batch'
+        namespace.letters = ''
+        namespace.contains = ''
+        return namespace
+
+    if head == 'validate':
+        if len(args) != 1:
+            parser.error('validate reads words from stdin and takes no arguments')
+        if namespace.stats:
+            parser.error('--stats is not supported by validate')
+        namespace.command = 'validate'
+        namespace.letters = ''
+        namespace.contains = ''
+        return namespace
+
     if head == 'search':
         if len(args) not in (2, 3):
             parser.error('search requires letters and optional contains')
@@ -55,16 +139,150 @@ def parse_args(argv: Sequence[str] | None = None):
     return namespace
 
 
+def _chunks(lines: Iterable[str]) -> Iterator[list[tuple[str, str] | str]]:
+    # Lines that are not "letters [contains]" stay in place as error messages.
+    chunk: list[tuple[str, str] | str] = []
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) > 2:
+            chunk.append(line.strip())
+        else:
+            chunk.append((parts[0], parts[1] if len(parts) == 2 else ''))
+        if len(chunk) == BATCH_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _search_chunk(
+    chunk: list[tuple[str, str] | str], counted: bool = False
+) -> tuple[list[list[str]], Stats | None]:
+    # Counters come back with the results so that chunks searched in worker
+    # processes are counted too.
+    stats = Stats() if counted else None
+    results = iter(
+        search_many(
+            [query for query in chunk if not isinstance(query, str)], stats=stats
+        )
+    )
+    return [[] if isinstance(query, str) else next(results) for query in chunk], stats
+
+
+def batch(
+    lines: Iterable[str],
+    output: TextIO,
+    processes: int | None = None,
+    stats: Stats | None = None,
+) -> None:
+    # Results are written in input order, one JSON object per line, as soon
+    # as each chunk finishes. At most two chunks per worker are in flight.
+    # Queries run in this process unless more than one worker is asked for.
+    workers = processes or 1
+    executor = _executor(workers) if workers > 1 else None
+    pending: deque = deque()
+
+    def write(chunk, searched):
+        results, counters = searched
+        if counters is not None:
+            stats.add(counters)
+        for query, words in zip(chunk, results):
+            if isinstance(query, str):
+                record = {'query': query, 'error': 'expected letters [contains]'}
+            else:
+                letters, contains = query
+                record = {'letters': letters, 'contains': contains, 'words': words}
+            output.write(json.dumps(record, separators=(',', ':')) + '\n')
+        output.flush()
+
+    try:
+        for chunk in _chunks(lines):
+            if executor is None:
+                write(chunk, _search_chunk(chunk, stats is not None))
+                continue
+            future = executor.submit(_search_chunk, chunk, stats is not None)
+            pending.append((chunk, future))
+            while len(pending) > 2 * workers or pending and pending[0][1].done():
+                chunk, future = pending.popleft()
+                write(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            write(chunk, future.result())
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def validate(lines: Iterable[str], output: TextIO) -> None:
+    # One word per line. Each chunk is checked in one validate_many() call and
+    # written in input order, one JSON object per line.
+    words = (line.strip() for line in lines)
+    words = (word for word in words if word)
+    while chunk := list(islice(words, BATCH_SIZE)):
+        for word, valid in zip(chunk, validate_many(chunk)):
+            record = {'word': word, 'valid': valid}
+            output.write(json.dumps(record, separators=(',', ':')) + '\n')
+        output.flush()
+
+
+def _print_stats(stats: Stats | None) -> None:
+    if stats is not None:
+        print(json.dumps(stats.as_dict(), sort_keys=True), file=sys.stderr)
+
+
 def main(argv: Sequence[str] | None = None):
     args = parse_args(argv)
+    stats = Stats() if args.stats else None
     if args.command == 'build':
-        dawg = args.dawg or 'www/dawg.js'
-        build(dawg=dawg, service_worker=args.service_worker)
+        dawg = args.dawg or 'www/dawg.bin'
+        build(
+            dawg=dawg,
+            service_worker=args.service_worker,
+            incremental=args.incremental,
+            gaddag=args.gaddag,
+            processes=args.processes,
+            stats=stats,
+        )
+        _print_stats(stats)
         return 0
 
-    load(filename=args.dawg or DAWG_JS)
-    for word in search(letters=args.letters, contains=args.contains):
+    if args.command == 'serve':
+        from .server import serve
+
+        serve(
+            host=args.host,
+            port=args.port,
+            processes=args.processes,
+            filename=args.dawg or DAWG_BIN,
+            lexicons=dict(option.split('=', 1) for option in args.lexicon),
+        )
+        return 0
+
+    load(filename=args.dawg or DAWG_BIN)
+    if args.command == 'batch':
+        batch(sys.stdin, sys.stdout, processes=args.processes, stats=stats)
+        _print_stats(stats)
+        return 0
+    if args.command == 'validate':
+        validate(sys.stdin, sys.stdout)
+        return 0
+
+    engine, workers = 'dawg', args.processes
+    if args.gaddag:
+        load_gaddag(filename=args.gaddag)
+        engine, workers = 'gaddag', None
+    words = search(
+        letters=args.letters,
+        contains=args.contains,
+        engine=engine,
+        workers=workers,
+        stats=stats,
+    )
+    for word in words:
         print(word)
+    _print_stats(stats)
     return 0
 
 
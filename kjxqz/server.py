@@ -0,0 +1,314 @@
+"HTTP/JSON search service backed by a pool of worker processes."
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import Counter
+from collections.abc import Mapping
+from concurrent.futures import Executor
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from . import DAWG_BIN, _executor, lexicon, load, register
+
+MAX_LETTERS = 15
+MAX_QUERIES = 1000
+MAX_BODY = 1 << 20
+KEEP_ALIVE_TIMEOUT = 15.0
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+    501: 'Not Implemented',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Server:
+    # Queries from concurrent requests are coalesced: while every worker is
+    # busy, new queries wait and are sent together to the next free worker,
+    # as one search_many() call per lexicon.
+
+    def __init__(self, executor: Executor, workers: int):
+        self.executor = executor
+        self.workers = workers
+        self.busy = 0
+        self.pending: list[
+            tuple[str | None, list[tuple[str, str]], asyncio.Future]
+        ] = []
+        self.requests: Counter[tuple[str, int]] = Counter()
+        self.counters: Counter[str] = Counter()
+        self.started = time.time()
+
+    async def search(
+        self, queries: list[tuple[str, str]], lexicon: str | None = None
+    ) -> list[list[str]]:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((lexicon, queries, future))
+        self.counters['queries_total'] += len(queries)
+        self._dispatch()
+        return await future
+
+    def _dispatch(self) -> None:
+        if not self.pending or self.busy >= self.workers:
+            return
+
+        batch, self.pending = self.pending, []
+        merged: dict[str | None, list[tuple[str, str]]] = {}
+        for name, group, _ in batch:
+            merged.setdefault(name, []).extend(group)
+        self.busy += 1
+        self.counters['batches_total'] += 1
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(
+            self.executor, _search_lexicons, list(merged.items())
+        )
+
+        def done(task: asyncio.Future) -> None:
+            self.busy -= 1
+            self.counters['search_seconds_total'] += time.perf_counter() - start
+            error = task.exception()
+            if not error:
+                results = dict(zip(merged, map(iter, task.result())))
+            for name, group, future in batch:
+                if future.done():
+                    continue
+                if error:
+                    future.set_exception(error)
+                else:
+                    future.set_result([next(results[name]) for _ in group])
+            self._dispatch()
+
+        task.add_done_callback(done)
+
+    async def handle(self, reader, writer) -> None:
+        self.counters['connections_total'] += 1
+        self.counters['connections_open'] += 1
+        try:
+            while await self._handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.counters['connections_open'] -= 1
+            writer.close()
+
+    async def _handle_request(self, reader, writer) -> bool:
+        try:
+            head = await asyncio.wait_for(
+                reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT
+            )
+        except asyncio.IncompleteReadError as error:
+            if error.partial:
+                raise
+            return False
+        except asyncio.LimitOverrunError:
+            await self._respond(writer, 431, {'error': 'headers too large'}, False)
+            return False
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ', 2)
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            await self._respond(writer, 400, {'error': 'malformed request'}, False)
+            return False
+
+        # Without chunked decoding the body would be read as the next request.
+        if 'transfer-encoding' in headers:
+            await self._respond(
+                writer, 501, {'error': 'transfer-encoding not supported'}, False
+            )
+            return False
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' or (
+            version == 'HTTP/1.1' and connection != 'close'
+        )
+
+        if length > MAX_BODY:
+            await self._respond(writer, 413, {'error': 'body too large'}, False)
+            return False
+        body = await reader.readexactly(length) if length else b''
+
+        path = urlsplit(target).path
+        if path not in ('/search', '/metrics'):
+            path = 'other'
+        try:
+            status, payload = 200, await self.route(method, target, body)
+        except HTTPError as error:
+            status, payload = error.status, {'error': str(error)}
+        except Exception as error:
+            status, payload = 500, {'error': type(error).__name__}
+        self.requests[path, status] += 1
+
+        await self._respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    async def route(self, method: str, target: str, body: bytes):
+        url = urlsplit(target)
+        if url.path == '/metrics':
+            if method != 'GET':
+                raise HTTPError(405, 'use GET')
+            return self.metrics()
+
+        if url.path != '/search':
+            raise HTTPError(404, 'not found')
+
+        if method == 'GET':
+            params = parse_qs(url.query)
+            letters = params.get('letters', [''])[0]
+            contains = params.get('contains', [''])[0]
+            name = _lexicon(params.get('lexicon', [None])[0])
+            query = _validate({'letters': letters, 'contains': contains})
+            (words,) = await self.search([query], name)
+            return {'letters': letters, 'contains': contains, 'words': words}
+
+        if method == 'POST':
+            try:
+                data = json.loads(body)
+                items = data['queries']
+                name = _lexicon(data.get('lexicon'))
+            except (ValueError, TypeError, KeyError, AttributeError):
+                raise HTTPError(400, 'expected {"queries": [...]}') from None
+            if not isinstance(items, list) or len(items) > MAX_QUERIES:
+                raise HTTPError(400, f'queries must be a list of at most {MAX_QUERIES}')
+            queries = [_validate(item) for item in items]
+            return {'results': await self.search(queries, name) if queries else []}
+
+        raise HTTPError(405, 'use GET or POST')
+
+    def metrics(self) -> str:
+        lines = [
+            '# TYPE kjxqz_requests_total counter',
+            *(
+                f'kjxqz_requests_total{{path="{path}",status="{status}"}} {count}'
+                for (path, status), count in sorted(self.requests.items())
+            ),
+        ]
+        for name in [
+            'queries_total',
+            'batches_total',
+            'search_seconds_total',
+            'connections_total',
+        ]:
+            lines.append(f'# TYPE kjxqz_{name} counter')
+            lines.append(f'kjxqz_{name} {self.counters[name]}')
+        gauges = {
+            'connections_open': self.counters['connections_open'],
+            'workers': self.workers,
+            'workers_busy': self.busy,
+            'queries_pending': sum(len(group) for _, group, _ in self.pending),
+            'uptime_seconds': round(time.time() - self.started, 3),
+        }
+        for name, value in gauges.items():
+            lines.append(f'# TYPE kjxqz_{name} gauge')
+            lines.append(f'kjxqz_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    async def _respond(self, writer, status: int, payload, keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            content_type = 'text/plain; version=0.0.4'
+            body = payload.encode()
+        else:
+            content_type = 'application/json'
+            body = json.dumps(payload, separators=(',', ':')).encode()
+        head = (
+            f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+            '\r\n'
+        )
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def _validate(item) -> tuple[str, str]:
+    if not isinstance(item, dict):
+        raise HTTPError(400, 'each query must be an object')
+    letters = item.get('letters', '')
+    contains = item.get('contains', '')
+    if not isinstance(letters, str) or not isinstance(contains, str):
+        raise HTTPError(400, 'letters and contains must be strings')
+    if not letters or len(letters) > MAX_LETTERS or len(contains) > MAX_LETTERS:
+        raise HTTPError(400, f'letters must have 1 to {MAX_LETTERS} characters')
+    return letters, contains
+
+
+def _lexicon(name) -> str | None:
+    try:
+        lexicon(name)
+    except (ValueError, TypeError):
+        raise HTTPError(400, 'unknown lexicon') from None
+    return name
+
+
+def _search_lexicons(
+    batch: list[tuple[str | None, list[tuple[str, str]]]],
+) -> list[list[list[str]]]:
+    return [lexicon(name).search_many(queries) for name, queries in batch]
+
+
+async def _serve(server: Server, host: str, port: int) -> None:
+    listener = await asyncio.start_server(server.handle, host, port)
+    addresses = ', '.join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f'Serving kjxqz on {addresses} with {server.workers} worker(s)')
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            pass
+
+    async with listener:
+        await stop.wait()
+
+
+def serve(
+    host: str = '127.0.0.1',
+    port: int = 8000,
+    processes: int | None = None,
+    filename: str | Path = DAWG_BIN,
+    lexicons: Mapping[str, str | Path] | None = None,
+) -> None:
+    # Load before forking so every worker shares the mapped graph pages. The
+    # same pool serves every lexicon.
+    load(filename)
+    for name, path in (lexicons or {}).items():
+        register(name, path)
+        lexicon(name)
+    workers = processes or os.cpu_count() or 1
+    executor = _executor(workers)
+    for future in [executor.submit(int) for _ in range(workers)]:
+        future.result()
+
+    try:
+        asyncio.run(_serve(Server(executor, workers), host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -1,15 +1,19 @@
 const CACHE_NAME = 'kjxqz-{HASH}';
-const assetsToCache = [
-    '/',
-    '/styles.css',
-    '/dawg.js',
-    '/main.js',
-];
+const assetsToCache = {ASSETS};
 
 self.addEventListener('install', (event) => {
     event.waitUntil(
         caches.open(CACHE_NAME).then((cache) => {
-            return cache.addAll(assetsToCache);
+            return Promise.all(assetsToCache.map((url) => {
+                // Hashed assets never change, so copy them from an older cache
+                // instead of downloading them again.
+                return caches.match(url).then((response) => {
+                    if (response && url !== '/') {
+                        return cache.put(url, response);
+                    }
+                    return cache.add(url);
+                });
+            }));
         })
     );
 });
@@ -0,0 +1,233 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import kjxqz
+
+# Timing differences below this many seconds are treated as noise.
+NOISE_SECONDS = 0.002
+
+# Letter values for the scored search benchmark.
+SCORES = {
+    letter: value
+    for letters, value in [
+        ('aeilnorstu', 1),
+        ('dg', 2),
+        ('bcmp', 3),
+        ('fhvwy', 4),
+        ('k', 5),
+        ('jx', 8),
+        ('qz', 10),
+    ]
+    for letter in letters
+}
+
+
+def make_corpus(words, count=300, seed=0):
+    rng = random.Random(seed)
+    letters = ''.join(words)
+    queries = []
+
+    for _ in range(count):
+        size = rng.randint(2, 12)
+        word = rng.choice(words)
+        rack = list(word[:size])
+        rack += rng.choices(letters, k=size - len(rack))
+        blanks = min(rng.choice((0, 0, 1, 2)), size - 1)
+        rack[:blanks] = '?' * blanks
+        rng.shuffle(rack)
+
+        contains = ''
+        if rng.random() < 0.4:
+            other = rng.choice(words)
+            start = rng.randrange(len(other))
+            contains = other[start : start + rng.randint(1, 3)]
+
+        queries.append((''.join(rack), contains))
+
+    return queries
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99), 'max': ordered[-1]}
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def timed(function, *args, repeat=1, **kwargs):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def bench_build(words, metrics):
+    metrics['build_dawg_seconds'] = timed(kjxqz.build_dawg, words)
+    metrics['build_dawg_peak_bytes'] = peak_memory(kjxqz.build_dawg, words)
+
+
+def bench_load(metrics):
+    metrics['load_bin_seconds'] = timed(kjxqz.load, kjxqz.DAWG_BIN, repeat=20)
+    metrics['load_js_seconds'] = timed(kjxqz.load, kjxqz.DAWG_JS, repeat=3)
+    metrics['load_bin_peak_bytes'] = peak_memory(kjxqz.load, kjxqz.DAWG_BIN)
+    metrics['load_js_peak_bytes'] = peak_memory(kjxqz.load, kjxqz.DAWG_JS)
+
+
+def bench_search(corpus, metrics):
+    kjxqz.load()
+    kjxqz.cache_resize(maxsize=0)
+
+    for name, function in [('search', kjxqz.search), ('isearch', kjxqz.isearch)]:
+        latencies = []
+        for letters, contains in corpus:
+            start = time.perf_counter()
+            for _ in function(letters, contains):
+                pass
+            latencies.append(time.perf_counter() - start)
+        for key, value in percentiles(latencies).items():
+            metrics[f'{name}_{key}_seconds'] = value
+        metrics[f'{name}_queries_per_second'] = len(corpus) / sum(latencies)
+
+    duration = timed(kjxqz.search_many, corpus)
+    metrics['search_many_queries_per_second'] = len(corpus) / duration
+
+    last = corpus[-1]
+    metrics['search_peak_bytes'] = peak_memory(kjxqz.search, *last)
+
+
+def bench_scored(corpus, metrics):
+    latencies = []
+    for letters, contains in corpus:
+        start = time.perf_counter()
+        kjxqz.search(letters, contains, score=SCORES, limit=10)
+        latencies.append(time.perf_counter() - start)
+    for key, value in percentiles(latencies).items():
+        metrics[f'search_top10_{key}_seconds'] = value
+    metrics['search_top10_queries_per_second'] = len(corpus) / sum(latencies)
+    start = time.perf_counter()
+    for letters, contains in corpus:
+        kjxqz.search(letters, contains, score=SCORES)
+    elapsed = time.perf_counter() - start
+    metrics['search_scored_queries_per_second'] = len(corpus) / elapsed
+
+
+def bench_ordered(corpus, metrics):
+    for name, offset in [('first_page', 0), ('page50', 980)]:
+        start = time.perf_counter()
+        for letters, contains in corpus:
+            list(kjxqz.isearch_ordered(letters, contains, offset, limit=20))
+        elapsed = time.perf_counter() - start
+        metrics[f'ordered_{name}_queries_per_second'] = len(corpus) / elapsed
+
+
+def bench_cli(metrics):
+    command = [sys.executable, '-m', 'kjxqz', 'search', 'retains', 'in']
+    metrics['cli_search_seconds'] = timed(
+        subprocess.run, command, repeat=5, capture_output=True, check=True
+    )
+
+
+def run(count=300, seed=0, build=True, cli=True):
+    words = kjxqz.load_words()
+    corpus = make_corpus(words, count=count, seed=seed)
+    metrics = {}
+
+    if build:
+        bench_build(words, metrics)
+    bench_load(metrics)
+    bench_search(corpus, metrics)
+    bench_scored(corpus, metrics)
+    bench_ordered(corpus, metrics)
+    if cli:
+        bench_cli(metrics)
+
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+        },
+        'corpus': {'count': count, 'seed': seed},
+        'metrics': metrics,
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, expected in sorted(baseline['metrics'].items()):
+        actual = results['metrics'].get(name)
+        if actual is None or not expected:
+            continue
+        if name.endswith('_per_second'):
+            change = expected / actual - 1 if actual else float('inf')
+        elif name.endswith('_seconds') and actual - expected < NOISE_SECONDS:
+            change = 0.0
+        else:
+            change = actual / expected - 1
+        status = 'REGRESSION' if change > threshold else 'ok'
+        print(f'{name:40} {expected:14.6g} {actual:14.6g} {change:+8.1%} {status}')
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark kjxqz build and search.')
+    parser.add_argument('--count', type=int, default=300, help='Number of racks.')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus random seed.')
+    parser.add_argument('--no-build', action='store_true', help='Skip build_dawg.')
+    parser.add_argument('--no-cli', action='store_true', help='Skip CLI startup.')
+    parser.add_argument('--output', help='Path to write JSON results.')
+    parser.add_argument('--baseline', help='Path to baseline JSON results.')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.25,
+        help='Allowed fractional regression against the baseline.',
+    )
+    args = parser.parse_args(argv)
+
+    results = run(
+        count=args.count, seed=args.seed, build=not args.no_build, cli=not args.no_cli
+    )
+
+    if args.output:
+        path = Path(args.output)
+        path.write_text(json.dumps(results, indent=4, sort_keys=True) + '\n')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} metric(s) regressed: {", ".join(regressions)}')
+            return 1
+    else:
+        print(json.dumps(results['metrics'], indent=4, sort_keys=True))
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,11 +1,21 @@
+import asyncio
+import gzip
 import inspect
+import io
 import json
 import re
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import pytest
 
 import kjxqz
 from kjxqz import __main__ as cli
+from kjxqz import server
+from tests import benchmark
 
 
 def test_build():
@@ -42,6 +52,89 @@ def test_build_dawg():
     assert not is_word_in_dawg(dawg, 'teas')
 
 
+def test_build_sorted_dawg():
+    words = sorted(['at', 'ate', 'late', 'plate', 'eat', 'tea', 'teas', 'seat', 'sat'])
+    root = kjxqz.simplify(kjxqz.convert(kjxqz.make_tree(words)))
+    expected = kjxqz.minimize(kjxqz.traverse(root), root)
+
+    data = kjxqz.build_sorted_dawg(iter(words))
+    assert json.dumps(data) == json.dumps(expected)
+    assert kjxqz.build_dawg(reversed(words)) == expected
+    assert kjxqz.build_sorted_dawg(['at', 'at', 'ate']) == kjxqz.build_dawg(
+        ['at', 'ate']
+    )
+
+    with pytest.raises(ValueError):
+        kjxqz.build_sorted_dawg(['tea', 'eat'])
+
+
+def test_build_dawg_sharded():
+    words = ['a', 'at', 'ate', 'ates', 'eat', 'eats', 'late', 'plate', 'plates']
+    words += ['sat', 'seat', 'seats', 'slate', 'tea', 'teas', 'zebra', 'zebras']
+    expected = json.dumps(kjxqz.build_dawg(words))
+
+    for size in range(1, len(words) + 1):
+        shards = [words[start : start + size] for start in range(0, len(words), size)]
+        tables = [kjxqz._build_shard(shard) for shard in shards]
+        assert json.dumps(kjxqz._number(*kjxqz._merge_shards(tables))) == expected
+
+    assert json.dumps(kjxqz.build_dawg(reversed(words), processes=2)) == expected
+    assert kjxqz.build_dawg(['at'], processes=2) == kjxqz.build_dawg(['at'])
+
+
+def test_update_dawg():
+    words = ['at', 'ate', 'eat', 'late', 'plate', 'tea', 'teas', 'seat', 'slate']
+    data = kjxqz.build_dawg(words)
+    before = {node: dict(branches) for node, branches in data.items()}
+
+    add = ['ates', 'plates', 'seats', 'zebra']
+    remove = ['eat', 'seat', 'slate', 'missing']
+    updated = kjxqz.update_dawg(data, add=add, remove=remove)
+    expected = sorted(set(words) - set(remove) | set(add))
+
+    assert updated is data
+    assert list(kjxqz.iter_words(data)) == expected
+    assert len(data) == len(kjxqz.build_dawg(expected))
+    assert sorted(map(int, data)) == list(range(len(data)))
+    assert any(before.get(node) == branches for node, branches in data.items())
+
+    kjxqz.update_dawg(data, remove=expected)
+    assert data == {'0': {}}
+
+
+def test_make_dawg_incremental(tmp_path):
+    words_path = tmp_path / 'words.txt'
+    words_path.write_text('at\nate\neat\ntea\n', encoding='utf-8')
+    kwargs = dict(
+        filename=tmp_path / 'dawg.js',
+        words_filename=words_path,
+        binary=tmp_path / 'dawg.bin',
+        incremental=True,
+    )
+    first = kjxqz.make_dawg(**kwargs)
+    before = {node: dict(branches) for node, branches in first.items()}
+
+    words_path.write_text('at\nate\neat\neats\ntea\nteas\n', encoding='utf-8')
+    second = kjxqz.make_dawg(**kwargs)
+
+    assert list(kjxqz.iter_words(second)) == ['at', 'ate', 'eat', 'eats', 'tea', 'teas']
+    assert second['0'] == before['0']
+    assert kjxqz.expand(kjxqz.load(kwargs['binary'])) == second
+
+
+def test_compact():
+    words = ['ate', 'eat', 'tea', 'eta', 'at']
+    data = kjxqz.build_dawg(words)
+    graph = kjxqz.compact(data)
+
+    assert len(graph.masks) == len(data)
+    assert len(graph.offsets) == len(data) + 1
+    assert len(graph.edges) == sum(
+        len([key for key in branches if key != '$']) for branches in data.values()
+    )
+    assert kjxqz.expand(graph) == data
+
+
 def test_make_dawg(tmp_path):
     words_path = tmp_path / 'words.txt'
     words_path.write_text('ate\ntea\nat\n', encoding='utf-8')
@@ -86,36 +179,130 @@ def test_make_service_worker(tmp_path):
     assert code in text
 
 
+def test_make_assets(tmp_path):
+    (tmp_path / 'main.js').write_text('main();\n', encoding='utf-8')
+    (tmp_path / 'styles.css').write_text('body {}\n', encoding='utf-8')
+    stale = tmp_path / 'main.0123456789abcdef.js.gz'
+    stale.write_bytes(b'')
+    manifest_path = tmp_path / 'manifest.json'
+
+    manifest = kjxqz.make_assets(
+        tmp_path, names=['main.js', 'styles.css'], manifest_filename=manifest_path
+    )
+
+    assert sorted(manifest) == ['/main.js', '/styles.css']
+    assert json.loads(manifest_path.read_text(encoding='utf-8')) == manifest
+    assert not stale.exists()
+    hashed = tmp_path / manifest['/main.js'].lstrip('/')
+    assert hashed.read_text(encoding='utf-8') == 'main();\n'
+    gzipped = Path(f'{hashed}.gz').read_bytes()
+    assert gzip.decompress(gzipped) == b'main();\n'
+    assert kjxqz.make_assets(tmp_path, names=['main.js'], manifest_filename=None) == {
+        '/main.js': manifest['/main.js']
+    }
+
+    template = tmp_path / 'index-template.html'
+    template.write_text(
+        '<script src="{/main.js}"></script>{MANIFEST}', encoding='utf-8'
+    )
+    text = kjxqz.make_index(
+        manifest, filename=tmp_path / 'index.html', template_filename=template
+    )
+    assert text.startswith(f'<script src="{manifest["/main.js"]}"></script>')
+    assert json.dumps(manifest, sort_keys=True) in text
+
+
 def test_build_assets(tmp_path):
     words_path = tmp_path / 'words.txt'
     words_path.write_text('ate\ntea\nat\n', encoding='utf-8')
 
     template = tmp_path / 'service-worker-template.js'
-    template.write_text("const CACHE_NAME = 'kjxqz-{HASH}';\n", encoding='utf-8')
+    template.write_text(
+        "const CACHE_NAME = 'kjxqz-{HASH}';\nconst assetsToCache = {ASSETS};\n",
+        encoding='utf-8',
+    )
+    index_template = tmp_path / 'index-template.html'
+    index_template.write_text('<script src="{/main.js}"></script>\n')
 
-    website_dawg_path = tmp_path / 'www' / 'dawg.js'
+    website_dir = tmp_path / 'www'
+    website_dir.mkdir()
+    for name in ['main.js', 'worker.js', 'styles.css']:
+        (website_dir / name).write_text(name, encoding='utf-8')
+
+    website_dawg_path = website_dir / 'dawg.bin'
     package_dawg_path = tmp_path / 'package' / 'dawg.js'
+    package_binary_path = tmp_path / 'package' / 'dawg.bin'
+    anagrams_path = tmp_path / 'package' / 'anagrams.txt'
     service_worker_path = tmp_path / 'service-worker.js'
     data, code = kjxqz.build(
         dawg=website_dawg_path,
         package_dawg=package_dawg_path,
+        package_binary=package_binary_path,
+        anagrams=anagrams_path,
         service_worker=service_worker_path,
         words_filename=words_path,
         template_filename=template,
         hash_filenames=[words_path, template],
+        assets=website_dir,
+        index=website_dir / 'index.html',
+        index_template_filename=index_template,
     )
 
     assert len(code) == 16
     assert website_dawg_path.exists()
     assert package_dawg_path.exists()
-    assert service_worker_path.exists()
+    assert package_binary_path.exists()
+    assert anagrams_path.read_text(encoding='utf-8') == 'aet ate tea\nat at\n'
+    manifest = json.loads((website_dir / 'manifest.json').read_text())
+    assert sorted(manifest) == ['/dawg.bin', '/main.js', '/styles.css', '/worker.js']
+    index_text = (website_dir / 'index.html').read_text(encoding='utf-8')
+    assert manifest['/main.js'] in index_text
+    service_worker = service_worker_path.read_text(encoding='utf-8')
+    assert all(url in service_worker for url in manifest.values())
+    assert Path(f'{service_worker_path}.gz').exists()
     assert is_word_in_dawg(data, 'ate')
     assert is_word_in_dawg(data, 'tea')
 
 
+def test_build_assets_from_other_cwd(tmp_path, monkeypatch):
+    words_path = tmp_path / 'words.txt'
+    words_path.write_text('ate\ntea\nat\n', encoding='utf-8')
+    website_dir = tmp_path / 'site'
+    website_dir.mkdir()
+    for name in ['main.js', 'worker.js', 'styles.css']:
+        (website_dir / name).write_text(name, encoding='utf-8')
+    (website_dir / 'dawg.bin').write_bytes(b'stale')
+    index_template = tmp_path / 'index-template.html'
+    index_template.write_text('<script src="{/dawg.bin}"></script>\n')
+
+    work = tmp_path / 'work'
+    work.mkdir()
+    monkeypatch.chdir(work)
+    options = dict(
+        package_dawg=tmp_path / 'package' / 'dawg.js',
+        package_binary=tmp_path / 'package' / 'dawg.bin',
+        anagrams=None,
+        service_worker='www/service-worker.js',
+        words_filename=words_path,
+        hash_filenames=[words_path],
+        assets=website_dir,
+        index=website_dir / 'index.html',
+        index_template_filename=index_template,
+    )
+    kjxqz.build(dawg='www/dawg.bin', **options)
+
+    manifest = json.loads((website_dir / 'manifest.json').read_text())
+    published = website_dir / manifest['/dawg.bin'].lstrip('/')
+    assert published.read_bytes() == (work / 'www' / 'dawg.bin').read_bytes()
+
+    with pytest.raises(ValueError):
+        kjxqz.build(dawg='www/dawg.js', **options)
+    assert not (work / 'www' / 'dawg.js').exists()
+
+
 def test_search_and_isearch(monkeypatch):
     words = ['at', 'ate', 'eat', 'eta', 'tea', 'late', 'plate']
-    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.build_dawg(words))
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(words)))
 
     assert kjxqz.search('aetl?', 'at') == ['plate', 'late', 'ate', 'eat', 'at']
 
@@ -124,6 +311,371 @@ def test_search_and_isearch(monkeypatch):
     assert len(results) == len(set(results))
 
 
+def brute_force_search(words, letters, contains=''):
+    rack = Counter(letters)
+    blanks = rack.pop('?', 0)
+    results = []
+    for word in words:
+        if contains not in word:
+            continue
+        start = word.index(contains)
+        needed = Counter(word[:start] + word[start + len(contains) :])
+        if sum((needed - rack).values()) <= blanks:
+            results.append(word)
+    results.sort(key=lambda word: (-len(word), word))
+    return results
+
+
+def test_isearch_repeated_letters(monkeypatch):
+    words = ['ana', 'anna', 'banana', 'bananas', 'eerie', 'sees', 'seer', 'seers']
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(words)))
+
+    for letters, contains in [
+        ('eeeerss', ''),
+        ('eeeerss??', ''),
+        ('bnnaa', 'an'),
+        ('bnsaa?', 'ana'),
+        ('?', 'ana'),
+        ('s?', 'ee'),
+    ]:
+        results = list(kjxqz.isearch(letters, contains))
+        assert len(results) == len(set(results))
+        expected = brute_force_search(words, letters, contains)
+        assert kjxqz.search(letters, contains) == expected
+
+
+def test_search_pattern(monkeypatch):
+    words = ['at', 'ate', 'late', 'plate', 'slate', 'slates', 'tale', 'teal']
+    graph = kjxqz.annotate(kjxqz.compact(kjxqz.build_dawg(words)))
+    monkeypatch.setattr(kjxqz, '_DAWG', graph)
+
+    assert kjxqz.search('ltsp', pattern='?la?e') == ['plate', 'slate']
+    assert kjxqz.search('ltsp', pattern='?LA?E') == ['plate', 'slate']
+    assert kjxqz.search('pp', pattern='?la?e') == []
+    assert kjxqz.search('t?s', pattern='?la?e') == ['plate', 'slate']
+    assert kjxqz.search('sts', pattern='?la?e', max_length=6) == [
+        'slates',
+        'slate',
+    ]
+    assert kjxqz.search('ael', pattern='t', max_length=4) == ['tale', 'teal']
+    assert kjxqz.search('aelt', min_length=4) == ['late', 'tale', 'teal']
+    assert list(kjxqz.isearch('ate', max_length=2)) == ['at']
+    assert kjxqz.search('lt?', pattern='?a??') == ['late', 'tale']
+
+    with pytest.raises(ValueError):
+        kjxqz.search('abc', pattern='a-c')
+    with pytest.raises(ValueError):
+        kjxqz.search('abc', contains='a', pattern='a??')
+
+
+def test_search_gaddag(tmp_path, monkeypatch):
+    monkeypatch.setattr(kjxqz, '_GADDAG', None)
+    words = ['aa', 'aaa', 'banana', 'bandana', 'nab', 'nana', 'ant', 'tan']
+    data = kjxqz.build_gaddag(words)
+    assert kjxqz.build_gaddag(reversed(words)) == data
+    path = tmp_path / 'gaddag.bin'
+    kjxqz._write_dawg_bin(kjxqz.compact(data), path)
+    assert kjxqz.expand(kjxqz.load_gaddag(path)) == data
+
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(words)))
+    kjxqz.cache_clear()
+    for letters, contains in [
+        ('a', 'a'),
+        ('bnn', 'ana'),
+        ('b?d', 'ana'),
+        ('??', 'an'),
+        ('t', 'na'),
+        ('', 'aa'),
+        ('bn', 'xyz'),
+    ]:
+        expected = brute_force_search(words, letters, contains)
+        kjxqz.cache_clear()
+        assert kjxqz.search(letters, contains, engine='gaddag') == expected
+
+    kjxqz.search('ab', 'c')
+    with pytest.raises(ValueError):
+        kjxqz.search('ab', 'c', engine='trie')
+    with pytest.raises(ValueError):
+        kjxqz.isearch('ab', 'c', engine='trie')
+    monkeypatch.setattr(kjxqz, '_GADDAG', None)
+    with pytest.raises(RuntimeError):
+        kjxqz.search('ab', 'x', engine='gaddag')
+
+
+def test_search_score(monkeypatch):
+    words = ['at', 'ate', 'eat', 'quiz', 'quit', 'tea', 'zap', 'zeta', 'quite']
+    values = {'a': 1, 'e': 1, 'i': 1, 'p': 3, 'q': 10, 't': 1, 'u': 1, 'z': 10}
+
+    def score(word, letters, contains=''):
+        rack = Counter(letters)
+        start = word.index(contains)
+        total = sum(values[letter] for letter in contains)
+        for letter in word[:start] + word[start + len(contains) :]:
+            if rack[letter]:
+                rack[letter] -= 1
+                total += values[letter]
+        return total
+
+    for graph in [
+        kjxqz.compact(kjxqz.build_dawg(words)),
+        kjxqz.annotate(kjxqz.compact(kjxqz.build_dawg(words))),
+    ]:
+        monkeypatch.setattr(kjxqz, '_DAWG', graph)
+        for letters, contains in [('quizate?', ''), ('aet?', 'z'), ('??', 'qu')]:
+            expected = sorted(
+                kjxqz.search(letters, contains),
+                key=lambda word: (-score(word, letters, contains), -len(word), word),
+            )
+            for limit in [None, 0, 1, 3]:
+                assert (
+                    kjxqz.search(letters, contains, score=values, limit=limit)
+                    == expected[:limit]
+                )
+
+    assert kjxqz.search('quizate?', limit=2) == ['quite', 'quit']
+    assert kjxqz.search('quizt?', score=values, limit=1) == ['quiz']
+    with pytest.raises(ValueError):
+        kjxqz.search('quiz', score={'q': -1})
+    with pytest.raises(ValueError):
+        kjxqz.search('quiz', score=values, pattern='q???')
+
+
+def test_isearch_ordered(monkeypatch):
+    words = ['at', 'ate', 'eat', 'quiz', 'quit', 'tea', 'zap', 'zeta', 'quite']
+
+    for graph in [
+        kjxqz.compact(kjxqz.build_dawg(words)),
+        kjxqz.annotate(kjxqz.compact(kjxqz.build_dawg(words))),
+    ]:
+        monkeypatch.setattr(kjxqz, '_DAWG', graph)
+        for letters, contains in [('quizate?', ''), ('aet?', ''), ('et', 'a')]:
+            kjxqz.cache_clear()
+            expected = kjxqz.search(letters, contains)
+            for cached in [False, True]:
+
+                def ordered(*args, **kwargs):
+                    if not cached:
+                        kjxqz.cache_clear()
+                    return list(
+                        kjxqz.isearch_ordered(letters, contains, *args, **kwargs)
+                    )
+
+                assert ordered() == expected
+                for offset, limit in [(0, 1), (2, 3), (1, 0), (0, 20)]:
+                    assert ordered(offset, limit) == expected[offset : offset + limit]
+                for index, word in enumerate(expected):
+                    assert ordered(after=word) == expected[index + 1 :]
+                    assert (
+                        ordered(limit=2, after=word) == expected[index + 1 : index + 3]
+                    )
+                kjxqz.search(letters, contains)
+
+            # A page holding every word, or any offset page, fills the cache.
+            for args, cached in [((0, 1), 0), ((0, 20), 1), ((1, 1), 1)]:
+                kjxqz.cache_clear()
+                list(kjxqz.isearch_ordered(letters, contains, *args))
+                assert kjxqz.cache_info().currsize == cached
+
+
+def test_search_many(monkeypatch):
+    words = ['at', 'ate', 'eat', 'tea', 'late', 'plate', 'banana', 'ana']
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(words)))
+    monkeypatch.setattr(kjxqz, '_CACHE', kjxqz.LRUCache())
+
+    queries = ['tae', 'eat', ('aetl?', 'at'), ('bnnaa', 'an'), 'tae', ('?', 'ana')]
+    expected = [
+        kjxqz.search(*((query, '') if isinstance(query, str) else query))
+        for query in queries
+    ]
+
+    # Clear the cache so the grouped engine answers every query.
+    for processes in [None, 2]:
+        kjxqz.cache_clear()
+        assert kjxqz.search_many(queries, processes=processes) == expected
+        assert kjxqz.cache_info().hits == 0
+    kjxqz._shutdown_pools()
+    assert kjxqz.search_many([]) == []
+
+
+def test_search_workers(monkeypatch):
+    words = ['a', 'at', 'ate', 'eat', 'tea', 'late', 'plate', 'banana', 'ana', 'tel']
+    graph = kjxqz.compact(kjxqz.build_dawg(words))
+    monkeypatch.setattr(kjxqz, '_DAWG', graph)
+    queries = [('tae', ''), ('l?', 'ate'), ('??', 'ana'), ('atelp', 'e'), ('bn', 'x')]
+
+    for depth in range(4):
+        for letters, contains in queries:
+            key = kjxqz._cache_key(letters, contains)
+            found, tasks = kjxqz._frontier(graph, *key, depth)
+            found += kjxqz._search_branches(key[1], tasks, graph)
+            assert sorted(found) == sorted(kjxqz.search(letters, contains))
+
+    for gil in [True, False]:
+        monkeypatch.setattr(sys, '_is_gil_enabled', lambda: gil, raising=False)
+        for letters, contains in queries:
+            expected = kjxqz.search(letters, contains)
+            kjxqz.cache_clear()
+            assert kjxqz.search(letters, contains, workers=2) == expected
+
+    monkeypatch.setattr(sys, '_is_gil_enabled', lambda: True, raising=False)
+    expected = kjxqz.search('tae')
+    with kjxqz._pool(2, graph) as pool:
+        with kjxqz._pool(2, graph) as again:
+            assert again is pool
+        other = kjxqz.compact(kjxqz.build_dawg(['ta']))
+        monkeypatch.setattr(kjxqz, '_DAWG', other)
+        assert kjxqz.search('tae', workers=2) == ['ta']
+        with kjxqz._pool(2, other) as again:
+            assert again is not pool
+
+        # A pool dropped from the cache still serves the search holding it.
+        graphs = [kjxqz.compact(kjxqz.build_dawg([word])) for word in 'abcd']
+        for dropping in graphs:
+            with kjxqz._pool(2, dropping):
+                pass
+        assert pool.submit(kjxqz.search, 'tae').result() == expected
+    with pytest.raises(RuntimeError):
+        pool.submit(kjxqz.search, 'tae')
+    kjxqz._shutdown_pools()
+
+    with pytest.raises(ValueError):
+        kjxqz.search('tae', workers=2, pattern='?a?')
+    with pytest.raises(ValueError):
+        kjxqz.search('tae', 'a', workers=2, engine='gaddag')
+
+
+def test_search_many_lexicons_concurrently():
+    kjxqz._shutdown_pools()
+    small = kjxqz.Dawg(kjxqz.compact(kjxqz.build_dawg(['at', 'ate', 'eat'])))
+    large = kjxqz.Dawg(kjxqz.compact(kjxqz.build_dawg(['at', 'tea', 'teas'])))
+    expected = {dawg: dawg.search_many(['tae', 'staet']) for dawg in [small, large]}
+
+    def run(dawg):
+        for _ in range(20):
+            dawg.cache.clear()
+            assert dawg.search_many(['tae', 'staet'], processes=2) == expected[dawg]
+
+    try:
+        with ThreadPoolExecutor(2) as executor:
+            for future in [executor.submit(run, dawg) for dawg in [small, large] * 2]:
+                future.result()
+        # Each lexicon keeps its own pool instead of replacing the other's.
+        assert len(kjxqz._POOLS) == 2
+    finally:
+        kjxqz._shutdown_pools()
+
+
+def test_executor_outside_linux(monkeypatch):
+    graph = kjxqz.compact(kjxqz.build_dawg(['at', 'ate', 'eat', 'tea']))
+    monkeypatch.setattr(kjxqz, '_DAWG', graph)
+    monkeypatch.setattr(sys, 'platform', 'darwin')
+    with kjxqz._executor(1) as executor:
+        assert executor.submit(kjxqz.search, 'tae').result() == [
+            'ate',
+            'eat',
+            'tea',
+            'at',
+        ]
+
+
+def test_dawg_lexicons(tmp_path, monkeypatch):
+    monkeypatch.setattr(kjxqz, '_REGISTRY', {})
+    monkeypatch.setattr(kjxqz, '_LEXICONS', {})
+    monkeypatch.setattr(kjxqz, '_GRAPHS', {})
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(['tea'])))
+    for name, words in [('small', ['at', 'ate', 'eat']), ('large', ['at', 'tea'])]:
+        path = tmp_path / f'{name}.bin'
+        kjxqz._write_dawg_bin(kjxqz.compact(kjxqz.build_dawg(words)), path)
+        kjxqz.register(name, path)
+    (tmp_path / 'copy.bin').write_bytes((tmp_path / 'small.bin').read_bytes())
+    kjxqz.register('copy', tmp_path / 'copy.bin')
+
+    assert kjxqz._LEXICONS == {}
+    small = kjxqz.lexicon('small')
+    assert kjxqz.lexicon('small') is small
+    assert list(kjxqz._LEXICONS) == ['small']
+    assert kjxqz.lexicon('copy').graph is small.graph
+    assert kjxqz.lexicon('copy').cache is not small.cache
+
+    assert small.search('tea?') == ['ate', 'eat', 'at']
+    assert list(small.isearch('ta')) == ['at']
+    assert kjxqz.lexicon('large').search('tea?') == ['tea', 'at']
+    assert kjxqz.search('tea?') == ['tea']
+    assert small.search_many(['tea', ('t', 'ea')], processes=2) == [
+        ['ate', 'eat', 'at'],
+        ['eat'],
+    ]
+    assert small.contains('EAT') and not small.contains('ea')
+    assert not small.contains('eat!')
+    assert kjxqz.lexicon().contains('tea')
+
+    with pytest.raises(ValueError):
+        kjxqz.lexicon('missing')
+    with pytest.raises(RuntimeError):
+        small.search('tea', exact=True)
+    with pytest.raises(RuntimeError):
+        kjxqz.Dawg(None).search('tea')
+
+
+def test_search_cache(monkeypatch):
+    monkeypatch.setattr(kjxqz, '_CACHE', kjxqz.LRUCache(maxsize=2))
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(['ate', 'eat'])))
+
+    assert kjxqz.search('tae?', '') == ['ate', 'eat']
+    assert kjxqz.search('eat?', '') == ['ate', 'eat']
+    assert list(kjxqz.isearch('?ETA')) == ['ate', 'eat']
+    info = kjxqz.cache_info()
+    assert (info.hits, info.misses, info.currsize, info.words) == (2, 1, 1, 2)
+
+    kjxqz.search('tea', 'e')
+    kjxqz.search('tea', 'a')
+    assert kjxqz.cache_info().currsize == 2
+    kjxqz.search('tae?')
+    assert kjxqz.cache_info().hits == 2
+
+    kjxqz.cache_resize(maxwords=1)
+    assert kjxqz.cache_info().words <= 1
+
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(['tea'])))
+    assert kjxqz.search('tae?') == ['tea']
+
+    kjxqz.cache_clear()
+    assert kjxqz.cache_info() == (0, 0, 2, 1, 0, 0)
+
+
+def test_search_exact(tmp_path, monkeypatch):
+    words = ['at', 'ate', 'eat', 'eta', 'tea', 'late', 'tael', 'teal', 'zebra']
+    path = tmp_path / 'anagrams.txt'
+    kjxqz._write_anagrams(kjxqz.build_anagrams(words), path)
+
+    monkeypatch.setattr(kjxqz, '_ANAGRAMS', None)
+    with pytest.raises(RuntimeError):
+        kjxqz.search('tea', exact=True)
+
+    kjxqz.load_anagrams(path)
+    monkeypatch.setattr(kjxqz, '_DAWG', None)
+    assert kjxqz.search('TAE', exact=True) == ['ate', 'eat', 'eta', 'tea']
+    assert kjxqz.search('ta?', exact=True) == ['ate', 'eat', 'eta', 'tea']
+    assert kjxqz.search('l?', 'ta', exact=True) == ['tael']
+    assert kjxqz.search('?', 'zebr', exact=True) == ['zebra']
+    assert kjxqz.search('a', 'ta', exact=True) == []
+    assert kjxqz.search('aaaa', exact=True) == []
+    assert kjxqz.search('zzzz', exact=True) == []
+
+    for letters, contains in [('ta?', ''), ('l?', 'ta'), ('?a?', 'e'), ('??', 'at')]:
+        expected = brute_force_search(words, letters, contains)
+        length = len(letters) + len(contains)
+        expected = sorted(word for word in expected if len(word) == length)
+        assert kjxqz.search(letters, contains, exact=True) == expected
+
+
+def test_count_letters():
+    counts = kjxqz.count_letters('Eat?e!')
+    assert counts[ord('e') - ord('a')] == 2
+    assert counts[kjxqz.BLANK] == 1
+    assert sum(counts) == 5
+
+
 def test_search_requires_load(monkeypatch):
     monkeypatch.setattr(kjxqz, '_DAWG', None)
     with pytest.raises(RuntimeError):
@@ -137,8 +689,141 @@ def test_load(tmp_path, monkeypatch):
 
     monkeypatch.setattr(kjxqz, '_DAWG', None)
     loaded = kjxqz.load(path)
-    assert loaded == data
-    assert kjxqz._DAWG == data
+    assert kjxqz.expand(loaded) == data
+    assert kjxqz._DAWG is loaded
+
+
+def test_load_binary(tmp_path, monkeypatch):
+    data = kjxqz.build_dawg(['at', 'ate', 'eat', 'tea'])
+    path = tmp_path / 'dawg.bin'
+    kjxqz._write_dawg_bin(kjxqz.compact(data), path)
+
+    monkeypatch.setattr(kjxqz, '_DAWG', None)
+    loaded = kjxqz.load(path)
+    assert isinstance(loaded.edges, memoryview)
+    assert kjxqz.expand(loaded) == data
+    assert kjxqz.search('tae') == ['ate', 'eat', 'tea', 'at']
+
+    payload = bytearray(path.read_bytes())
+    payload[-1] ^= 0xFF
+    path.write_bytes(payload)
+    with pytest.raises(ValueError):
+        kjxqz.load(path)
+
+
+def test_make_dawg_website_binary(tmp_path, monkeypatch):
+    words_path = tmp_path / 'words.txt'
+    words_path.write_text('at\nate\neat\ntea\n', encoding='utf-8')
+    path = tmp_path / 'dawg.bin'
+    data = kjxqz.make_dawg(filename=path, words_filename=words_path)
+
+    header = kjxqz.HEADER.unpack(path.read_bytes()[: kjxqz.HEADER.size])
+    assert header[2] == kjxqz.NARROW | kjxqz.IMPLICIT
+    assert path.stat().st_size % 4 == 0
+
+    monkeypatch.setattr(kjxqz, '_DAWG', None)
+    loaded = kjxqz.load(path)
+    assert loaded.edges.itemsize == 2
+    assert kjxqz.expand(loaded) == data
+    assert kjxqz.search('tae') == ['ate', 'eat', 'tea', 'at']
+
+
+def test_annotate(tmp_path, monkeypatch):
+    words = ['at', 'ate', 'eat', 'tea', 'zebra', 'zebras', 'quiz']
+    graph = kjxqz.annotate(kjxqz.compact(kjxqz.build_dawg(words)))
+
+    assert graph.shortest[0] == 2
+    assert graph.longest[0] == 6
+    assert graph.reach[0] == sum(kjxqz.BITS[letter] for letter in set(''.join(words)))
+
+    path = tmp_path / 'dawg.bin'
+    kjxqz._write_dawg_bin(graph, path)
+    monkeypatch.setattr(kjxqz, '_DAWG', None)
+    monkeypatch.setattr(kjxqz, '_CACHE', kjxqz.LRUCache())
+    loaded = kjxqz.load(path)
+    assert list(loaded.reach) == list(graph.reach)
+    assert list(loaded.shortest) == list(graph.shortest)
+    assert list(loaded.longest) == list(graph.longest)
+
+    for letters, contains in [
+        ('aet?', ''),
+        ('abers?', 'z'),
+        ('iu?', 'q'),
+        ('??', 'eb'),
+    ]:
+        expected = brute_force_search(words, letters, contains)
+        assert kjxqz.search(letters, contains) == expected
+
+
+def test_stats(tmp_path, monkeypatch):
+    words = ['at', 'ate', 'eat', 'tea', 'zebra', 'zebras', 'quiz']
+    dawg = kjxqz.Dawg(kjxqz.annotate(kjxqz.compact(kjxqz.build_dawg(words))))
+    records = []
+    monkeypatch.setattr(kjxqz, '_STATS_HOOK', None)
+    kjxqz.set_stats_hook(records.append)
+
+    stats = kjxqz.Stats()
+    assert dawg.search('aet?', stats=stats) == brute_force_search(words, 'aet?', '')
+    assert stats.searches == 1 and stats.cache_hits == 0
+    assert stats.words == len(brute_force_search(words, 'aet?', ''))
+    assert stats.nodes > 0 and stats.edges > 0
+    assert stats.blanks > 0 and stats.pruned > 0
+
+    dawg.search('tea?', stats=stats)
+    assert stats.searches == 2 and stats.cache_hits == 1
+    assert [record['letters'] for record in records] == ['aet?', 'tea?']
+    assert records[1]['event'] == 'search' and records[1]['cache_hits'] == 1
+
+    counted = kjxqz.Stats()
+    assert list(dawg.isearch('abers?', 'z', stats=counted)) == ['zebra', 'zebras']
+    assert counted.searches == 1 and counted.words == 2 and counted.nodes > 0
+
+    graph = dawg._get_graph()
+    for letters, contains in [('aet?', ''), ('abers?', 'z'), ('iu?', 'q'), ('??', 'e')]:
+        key = kjxqz._cache_key(letters, contains)
+        expected = list(kjxqz._isearch(graph, *key))
+        assert (
+            list(kjxqz._isearch_counted(graph, *key, None, kjxqz.Stats())) == expected
+        )
+
+    kjxqz.set_stats_hook(None)
+    words_path = tmp_path / 'words.txt'
+    words_path.write_text('at\nate\neat\ntea\n', encoding='utf-8')
+    built = kjxqz.Stats()
+    kjxqz.make_dawg(
+        filename=tmp_path / 'dawg.js',
+        words_filename=words_path,
+        binary=tmp_path / 'dawg.bin',
+        stats=built,
+    )
+    assert set(built.phases) == {
+        'load_words',
+        'build_dawg',
+        'write_website_dawg',
+        'write_binary',
+    }
+    assert len(records) == 2
+
+
+def test_validate_many(monkeypatch):
+    words = ['at', 'ate', 'eat', 'eats', 'tea', 'teas', 'zebra']
+    dawg = kjxqz.build_dawg(words)
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(dawg))
+
+    assert kjxqz.contains('eats') and kjxqz.contains('TEA')
+    assert not kjxqz.contains('ea') and not kjxqz.contains('')
+    assert kjxqz.has_prefix('zeb') and kjxqz.has_prefix('')
+    assert not kjxqz.has_prefix('zz') and not kjxqz.has_prefix('t3')
+
+    batch = ['teas', 'te', 'zebras', 'at', 'eat', 'Eats', 'a', 'tea', 'z?', 'at']
+    expected = [is_word_in_dawg(dawg, word.lower()) for word in batch]
+    assert kjxqz.validate_many(batch) == expected
+    assert kjxqz.validate_many([]) == []
+
+
+def test_packaged_dawg_bin_matches_dawg_js():
+    graph = kjxqz._read(kjxqz.DAWG_BIN)
+    assert kjxqz.expand(graph) == kjxqz.expand(kjxqz._read(kjxqz.DAWG_JS))
 
 
 def test_isearch_signature_has_no_sorted_arg():
@@ -156,7 +841,169 @@ def test_cli_main_build(monkeypatch):
     code = cli.main([])
 
     assert code == 0
-    assert calls == [{'dawg': 'www/dawg.js', 'service_worker': 'www/service-worker.js'}]
+    assert calls == [
+        {
+            'dawg': 'www/dawg.bin',
+            'service_worker': 'www/service-worker.js',
+            'incremental': False,
+            'gaddag': None,
+            'processes': None,
+            'stats': None,
+        }
+    ]
+
+
+def test_server(tmp_path, monkeypatch):
+    words = ['at', 'ate', 'eat', 'tea', 'late', 'plate']
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(words)))
+    monkeypatch.setattr(kjxqz, '_REGISTRY', {})
+    monkeypatch.setattr(kjxqz, '_LEXICONS', {})
+    path = tmp_path / 'short.bin'
+    kjxqz._write_dawg_bin(kjxqz.compact(kjxqz.build_dawg(['at', 'ta'])), path)
+    kjxqz.register('short', path)
+
+    async def request(reader, writer, method, target, body=b''):
+        head = f'{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n'
+        writer.write(head.encode() + body)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while line := (await reader.readline()).strip():
+            name, value = line.decode().split(':', 1)
+            headers[name.lower()] = value.strip()
+        payload = await reader.readexactly(int(headers['content-length']))
+        return status, headers, payload
+
+    async def scenario():
+        with ThreadPoolExecutor(2) as executor:
+            app = server.Server(executor, workers=2)
+            listener = await asyncio.start_server(app.handle, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+            status, headers, payload = await request(
+                reader, writer, 'GET', '/search?letters=aetl%3F&contains=at'
+            )
+            assert status == 200
+            assert headers['connection'] == 'keep-alive'
+            assert json.loads(payload)['words'] == ['plate', 'late', 'ate', 'eat', 'at']
+
+            body = json.dumps(
+                {'queries': [{'letters': 'tae'}, {'letters': 'l?', 'contains': 'ate'}]}
+            ).encode()
+            status, _, payload = await request(reader, writer, 'POST', '/search', body)
+            assert status == 200
+            assert json.loads(payload) == {
+                'results': [['ate', 'eat', 'tea', 'at'], ['plate', 'late', 'ate']]
+            }
+
+            results = await asyncio.gather(
+                *(app.search([('tea', '')]) for _ in range(5))
+            )
+            assert results == [[['ate', 'eat', 'tea', 'at']]] * 5
+
+            status, _, _ = await request(reader, writer, 'POST', '/search', b'[')
+            assert status == 400
+            status, _, _ = await request(reader, writer, 'GET', '/search?letters=')
+            assert status == 400
+            status, _, _ = await request(reader, writer, 'GET', '/nowhere')
+            assert status == 404
+
+            status, headers, payload = await request(reader, writer, 'GET', '/metrics')
+            assert status == 200
+            text = payload.decode()
+            assert 'kjxqz_requests_total{path="/search",status="200"} 2' in text
+            assert 'kjxqz_requests_total{path="other",status="404"} 1' in text
+            assert 'kjxqz_queries_total 8' in text
+            assert 'kjxqz_connections_open 1' in text
+
+            body = json.dumps({'lexicon': 'short', 'queries': [{'letters': 'tae'}]})
+            status, _, payload = await request(
+                reader, writer, 'POST', '/search', body.encode()
+            )
+            assert json.loads(payload) == {'results': [['at', 'ta']]}
+            status, _, payload = await request(
+                reader, writer, 'GET', '/search?letters=tae&lexicon=short'
+            )
+            assert json.loads(payload)['words'] == ['at', 'ta']
+            status, _, _ = await request(
+                reader, writer, 'GET', '/search?letters=tae&lexicon=long'
+            )
+            assert status == 400
+
+            writer.close()
+            listener.close()
+            await listener.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_server_rejects_unsupported_framing():
+    async def exchange(port, data):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(data)
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return response.decode()
+
+    async def scenario():
+        with ThreadPoolExecutor(1) as executor:
+            app = server.Server(executor, workers=1)
+            listener = await asyncio.start_server(app.handle, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            negative = await exchange(
+                port, b'POST /search HTTP/1.1\r\nContent-Length: -5\r\n\r\n'
+            )
+            chunked = await exchange(
+                port,
+                b'POST /search HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n'
+                b'5\r\nhello\r\n0\r\n\r\n',
+            )
+            listener.close()
+            await listener.wait_closed()
+            return negative, chunked
+
+    negative, chunked = asyncio.run(scenario())
+    assert negative.startswith('HTTP/1.1 400 ')
+    assert chunked.startswith('HTTP/1.1 501 ')
+    assert chunked.count('HTTP/1.1') == 1
+    assert 'Connection: close' in chunked
+
+
+def test_server_metrics_while_pending(monkeypatch):
+    release = threading.Event()
+
+    def blocked(batch):
+        release.wait()
+        return [[[] for _ in queries] for _, queries in batch]
+
+    monkeypatch.setattr(server, '_search_lexicons', blocked)
+
+    async def scenario():
+        with ThreadPoolExecutor(1) as executor:
+            app = server.Server(executor, workers=1)
+            first = asyncio.ensure_future(app.search([('tea', '')]))
+            second = asyncio.ensure_future(app.search([('at', ''), ('eat', '')]))
+            await asyncio.sleep(0)
+            assert app.busy == 1 and len(app.pending) == 1
+
+            listener = await asyncio.start_server(app.handle, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET /metrics HTTP/1.1\r\nConnection: close\r\n\r\n')
+            response = (await reader.read()).decode()
+            writer.close()
+            listener.close()
+            await listener.wait_closed()
+
+            release.set()
+            assert await first == [[]]
+            assert await second == [[], []]
+            return response
+
+    response = asyncio.run(scenario())
+    assert response.startswith('HTTP/1.1 200 ')
+    assert 'kjxqz_queries_pending 2\n' in response
 
 
 def test_cli_main_search_shorthand(monkeypatch, capsys):
@@ -168,3 +1015,94 @@ def test_cli_main_search_shorthand(monkeypatch, capsys):
     assert code == 0
     assert len(calls) == 1
     assert capsys.readouterr().out == 'alpha\nbeta\n'
+
+
+def test_cli_batch(monkeypatch):
+    words = ['at', 'ate', 'eat', 'tea', 'late', 'plate']
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(words)))
+    monkeypatch.setattr(cli, 'BATCH_SIZE', 2)
+    lines = ['tae\n', '\n', 'aetl? at\n', 'a b c\n', 'zz\n']
+
+    for processes in [1, 2]:
+        output = io.StringIO()
+        stats = kjxqz.Stats()
+        cli.batch(lines, output, processes=processes, stats=stats)
+        assert (stats.searches, stats.words) == (3, 9)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert records == [
+            {'letters': 'tae', 'contains': '', 'words': ['ate', 'eat', 'tea', 'at']},
+            {
+                'letters': 'aetl?',
+                'contains': 'at',
+                'words': ['plate', 'late', 'ate', 'eat', 'at'],
+            },
+            {'query': 'a b c', 'error': 'expected letters [contains]'},
+            {'letters': 'zz', 'contains': '', 'words': []},
+        ]
+
+    monkeypatch.setattr(kjxqz.os, 'cpu_count', lambda: 4)
+    monkeypatch.setattr(cli, '_executor', lambda workers: pytest.fail('pooled'))
+    output = io.StringIO()
+    cli.batch(lines, output)
+    assert len(output.getvalue().splitlines()) == 4
+
+
+def test_cli_validate(monkeypatch):
+    words = ['at', 'ate', 'eat', 'tea']
+    monkeypatch.setattr(kjxqz, '_DAWG', kjxqz.compact(kjxqz.build_dawg(words)))
+    monkeypatch.setattr(cli, 'BATCH_SIZE', 2)
+    output = io.StringIO()
+
+    cli.validate(['tea\n', '\n', ' eta \n', 'AT\n'], output)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records == [
+        {'word': 'tea', 'valid': True},
+        {'word': 'eta', 'valid': False},
+        {'word': 'AT', 'valid': True},
+    ]
+
+
+def test_cli_batch_arguments_do_not_load(monkeypatch):
+    monkeypatch.setattr(cli, 'load', lambda filename: pytest.fail('loaded'))
+    with pytest.raises(SystemExit):
+        cli.main(['batch', 'extra'])
+    for command in ['validate', 'serve']:
+        with pytest.raises(SystemExit):
+            cli.main(['--stats', command])
+
+
+def test_benchmark_corpus_and_compare(capsys):
+    words = ['at', 'ate', 'eat', 'tea', 'plate']
+    corpus = benchmark.make_corpus(words, count=50, seed=1)
+
+    assert corpus == benchmark.make_corpus(words, count=50, seed=1)
+    assert all(2 <= len(letters) <= 12 for letters, _ in corpus)
+    assert all(letters.count('?') <= 2 for letters, _ in corpus)
+    assert any(contains for _, contains in corpus)
+
+    baseline = {
+        'metrics': {
+            'search_p50_seconds': 1.0,
+            'load_bin_seconds': 0.0005,
+            'search_queries_per_second': 10,
+        }
+    }
+    faster = {
+        'metrics': {
+            'search_p50_seconds': 0.5,
+            'load_bin_seconds': 0.001,
+            'search_queries_per_second': 20,
+        }
+    }
+    slower = {
+        'metrics': {
+            'search_p50_seconds': 1.5,
+            'load_bin_seconds': 0.0005,
+            'search_queries_per_second': 5,
+        }
+    }
+    assert benchmark.compare(faster, baseline, threshold=0.25) == []
+    assert benchmark.compare(slower, baseline, threshold=0.25) == [
+        'search_p50_seconds',
+        'search_queries_per_second',
+    ]
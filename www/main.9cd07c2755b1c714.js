@@ -0,0 +1,143 @@
+var manifest = JSON.parse(document.getElementById('manifest').textContent);
+var worker = new Worker(asset('/worker.js'));
+var query_id = 0;
+var sections = null;
+var dirty = new Set();
+
+function asset(path) {
+    // The build maps each asset to its content-hashed filename.
+    return manifest[path] || path;
+}
+
+function update() {
+    var query_value = document.getElementById('query').value;
+    var has_query = query_value.trim().length > 0;
+    var word_list_help = document.getElementById('word-list-help');
+
+    if (word_list_help) {
+        word_list_help.style.display = has_query ? 'none' : '';
+    }
+
+    var output = document.getElementById('output');
+
+    // A new query id makes the worker drop the search in flight and makes
+    // any of its messages still queued here stale.
+    query_id += 1;
+    sections = null;
+    dirty.clear();
+
+    if (!has_query) {
+        output.innerHTML = '';
+        return;
+    }
+
+    gtag('event', 'view_search_results', {'search_term': query_value});
+    var options = parse();
+    draw(options);
+    worker.postMessage({
+        id: query_id,
+        letters: options.get('letters'),
+        contains: options.get('contains'),
+    });
+}
+
+function parse() {
+    var options = new Map([['letters', ''], ['contains', '']]);
+    var input_query = document.getElementById('query');
+    var query = input_query.value;
+    var lower_query = query.toLowerCase();
+    var parts = lower_query.split(/\s+/);
+    var letters = parts.shift() || '';
+    letters = /^[a-z?]{1,12}$/.test(letters) ? letters : '';
+    letters = (letters.match(/\?/g) || []).length <= 2 ? letters : '';
+    options.set('letters', letters);
+    var contains = parts.shift() || '';
+    contains = /^[a-z]{1,12}$/.test(contains) ? contains : '';
+    options.set('contains', contains);
+    return options;
+}
+
+function draw(options) {
+    var parts = [
+        '<p>',
+        '<span class="word">',
+        'Letters: ' + options.get('letters'),
+        '</span>',
+    ];
+
+    if (options.get('contains').length > 0) {
+        parts.push('<br>');
+        parts.push('<span class="word">');
+        parts.push('Contains: ' + options.get('contains'));
+        parts.push('</span>');
+    }
+    parts.push('</p>');
+
+    var output = document.getElementById('output');
+    output.innerHTML = parts.join('\n');
+    sections = new Map();
+}
+
+function receive(event) {
+    var message = event.data;
+
+    if (message.id != query_id || sections === null) {
+        return;
+    }
+
+    message.groups.forEach(function (group) {
+        var length = group[0];
+        var section = sections.get(length);
+
+        if (section === undefined) {
+            section = {element: document.createElement('p'), words: []};
+            sections.set(length, section);
+            place(length, section.element);
+        }
+        section.words.push.apply(section.words, group[1]);
+
+        if (dirty.size == 0) {
+            requestAnimationFrame(render);
+        }
+        dirty.add(length);
+    });
+}
+
+function place(length, element) {
+    // Sections are kept longest first below the query summary.
+    var output = document.getElementById('output');
+    var before = null;
+
+    sections.forEach(function (section, other) {
+        if (other < length && (before === null || other > before[0])) {
+            before = [other, section.element];
+        }
+    });
+    output.insertBefore(element, before === null ? null : before[1]);
+}
+
+function render() {
+    if (sections === null) {
+        return;
+    }
+
+    dirty.forEach(function (length) {
+        var section = sections.get(length);
+        var parts = [];
+
+        section.words.sort();
+        section.words.forEach(function (word) {
+            var link = 'https://www.google.com/search?q=';
+            link += encodeURIComponent('define:' + word);
+            parts.push('<a class="word" href="' + link + '" target="_blank">'
+                       + word + '</a>');
+        });
+        section.element.innerHTML = parts.join('\n');
+    });
+    dirty.clear();
+}
+
+worker.onmessage = receive;
+worker.postMessage({dawg: asset('/dawg.bin')});
+
+document.getElementById('query').focus();
@@ -1,3 +1,14 @@
+var manifest = JSON.parse(document.getElementById('manifest').textContent);
+var worker = new Worker(asset('/worker.js'));
+var query_id = 0;
+var sections = null;
+var dirty = new Set();
+
+function asset(path) {
+    // The build maps each asset to its content-hashed filename.
+    return manifest[path] || path;
+}
+
 function update() {
     var query_value = document.getElementById('query').value;
     var has_query = query_value.trim().length > 0;
@@ -9,6 +20,12 @@ function update() {
 
     var output = document.getElementById('output');
 
+    // A new query id makes the worker drop the search in flight and makes
+    // any of its messages still queued here stale.
+    query_id += 1;
+    sections = null;
+    dirty.clear();
+
     if (!has_query) {
         output.innerHTML = '';
         return;
@@ -16,8 +33,12 @@ function update() {
 
     gtag('event', 'view_search_results', {'search_term': query_value});
     var options = parse();
-    var results = matches(options);
-    draw(options, results);
+    draw(options);
+    worker.postMessage({
+        id: query_id,
+        letters: options.get('letters'),
+        contains: options.get('contains'),
+    });
 }
 
 function parse() {
@@ -36,7 +57,7 @@ function parse() {
     return options;
 }
 
-function draw(options, results) {
+function draw(options) {
     var parts = [
         '<p>',
         '<span class="word">',
@@ -52,106 +73,71 @@ function draw(options, results) {
     }
     parts.push('</p>');
 
-    var last = -1;
+    var output = document.getElementById('output');
+    output.innerHTML = parts.join('\n');
+    sections = new Map();
+}
 
-    for (var index = 0; index < results.length; index += 1) {
-        var word = results[index];
+function receive(event) {
+    var message = event.data;
 
-        if (word.length != last) {
-            if (index > 0) {
-                parts.push('</p>');
-            }
-            parts.push('<p>');
-            last = word.length;
-        }
-        var link = 'https://www.google.com/search?q=';
-        link += encodeURIComponent('define:' + word);
-        parts.push('<a class="word" href="' + link + '" target="_blank">'
-                   + word + '</a>');
+    if (message.id != query_id || sections === null) {
+        return;
     }
-    parts.push('</p>');
 
-    var output = document.getElementById('output');
-    output.innerHTML = parts.join('\n');
-}
+    message.groups.forEach(function (group) {
+        var length = group[0];
+        var section = sections.get(length);
 
-function matches(options) {
-    var value = [];
-    var letters = Array.from(options.get('letters'));
-    var contains = Array.from(options.get('contains'));
-    var alphabet = Array.from('abcdefghijklmnopqrstuvwxyz');
-    var results = [];
-
-    function helper(state, contained) {
-        var branches = dawg[state];
-
-        if (contained) {
-            if ('$' in branches) {
-                var result = value.join('');
-                results.push(result);
-            }
-            traverse(state, true);
+        if (section === undefined) {
+            section = {element: document.createElement('p'), words: []};
+            sections.set(length, section);
+            place(length, section.element);
         }
-        else {
-            traverse(state, false);
-
-            var contains_length = contains.length;
-
-            for (var index = 0; index < contains_length; index += 1) {
-                var letter = contains[index];
-
-                if (letter in branches) {
-                    value.push(letter);
-                    state = branches[letter];
-                    branches = dawg[state]
-                }
-                else {
-                    for (var count = 0; count < index; count += 1) {
-                        value.pop();
-                    }
-                    return;
-                }
-            }
-            helper(state, true);
-            for (var count = 0; count < contains_length; count += 1) {
-                value.pop();
-            }
-        }
-    }
+        section.words.push.apply(section.words, group[1]);
 
-    function traverse(state, contained) {
-        var branches = dawg[state];
-        var letters_length = letters.length;
-
-        for (var count = 0; count < letters_length; count += 1) {
-            var letter = letters.shift();
-            var choices = letter == '?' ? alphabet : [letter];
-            var choices_length = choices.length;
-
-            for (var index = 0; index < choices_length; index += 1) {
-                var choice = choices[index];
-
-                if (choice in branches) {
-                    value.push(choice);
-                    state = branches[choice];
-                    helper(state, contained);
-                    value.pop();
-                }
-            }
-            letters.push(letter);
+        if (dirty.size == 0) {
+            requestAnimationFrame(render);
         }
-    }
+        dirty.add(length);
+    });
+}
 
-    helper('0', contains.length == 0);
+function place(length, element) {
+    // Sections are kept longest first below the query summary.
+    var output = document.getElementById('output');
+    var before = null;
 
-    results.sort(function(alpha, beta) {
-        return (beta.length - alpha.length
-                || alpha.localeCompare(beta));
+    sections.forEach(function (section, other) {
+        if (other < length && (before === null || other > before[0])) {
+            before = [other, section.element];
+        }
     });
+    output.insertBefore(element, before === null ? null : before[1]);
+}
+
+function render() {
+    if (sections === null) {
+        return;
+    }
 
-    return results.filter(function (element, index, results) {
-        return index == 0 || results[index - 1] != element;
+    dirty.forEach(function (length) {
+        var section = sections.get(length);
+        var parts = [];
+
+        section.words.sort();
+        section.words.forEach(function (word) {
+            var link = 'https://www.google.com/search?q=';
+            link += encodeURIComponent('define:' + word);
+            parts.push('<a class="word" href="' + link + '" target="_blank">'
+                       + word + '</a>');
+        });
+        section.element.innerHTML = parts.join('\n');
     });
+    dirty.clear();
 }
 
+worker.onmessage = receive;
+worker.postMessage({dawg: asset('/dawg.bin')});
+
 document.getElementById('query').focus();
@@ -1,15 +1,25 @@
-const CACHE_NAME = 'kjxqz-14ce708ce9a99731';
+const CACHE_NAME = 'kjxqz-974e264458bd02f3';
 const assetsToCache = [
     '/',
-    '/styles.css',
-    '/dawg.js',
-    '/main.js',
+    '/dawg.107daaf3827c01f3.bin',
+    '/main.9cd07c2755b1c714.js',
+    '/styles.9fb47e39fba94708.css',
+    '/worker.f2c1129609c6436f.js'
 ];
 
 self.addEventListener('install', (event) => {
     event.waitUntil(
         caches.open(CACHE_NAME).then((cache) => {
-            return cache.addAll(assetsToCache);
+            return Promise.all(assetsToCache.map((url) => {
+                // Hashed assets never change, so copy them from an older cache
+                // instead of downloading them again.
+                return caches.match(url).then((response) => {
+                    if (response && url !== '/') {
+                        return cache.put(url, response);
+                    }
+                    return cache.add(url);
+                });
+            }));
         })
     );
 });
@@ -0,0 +1,245 @@
+// Searches the DAWG off the main thread. Each query runs in short slices so
+// that a newer query, which replaces `current`, cancels it between slices.
+// Words found in a slice are posted back grouped by length.
+
+var SLICE_MILLISECONDS = 8;
+var graph = null;
+var current = null;
+
+function load(url) {
+    // See the binary layout notes in kjxqz/__init__.py.
+    return fetch(url).then(function (response) {
+        return response.arrayBuffer();
+    }).then(function (buffer) {
+        var view = new DataView(buffer);
+        var magic = String.fromCharCode.apply(null, new Uint8Array(buffer, 0, 8));
+        var version = view.getUint32(8, true);
+        var flags = view.getUint32(12, true);
+        var size = view.getUint32(16, true);
+        var edge_count = view.getUint32(20, true);
+
+        if (magic != 'KJXQZDWG' || version != 3 || !(flags & 4)) {
+            throw new Error('unsupported dawg.bin');
+        }
+
+        var masks = new Uint32Array(buffer, 28, size);
+        var start = 28 + size * 4;
+        var edges = flags & 2
+            ? new Uint16Array(buffer, start, edge_count)
+            : new Uint32Array(buffer, start, edge_count);
+        var offsets = new Uint32Array(size + 1);
+
+        for (var state = 0; state < size; state += 1) {
+            offsets[state + 1] = offsets[state] + popcount(masks[state] & 0x3ffffff);
+        }
+        graph = {masks: masks, offsets: offsets, edges: edges};
+    });
+}
+
+function popcount(value) {
+    value -= (value >>> 1) & 0x55555555;
+    value = (value & 0x33333333) + ((value >>> 2) & 0x33333333);
+    return (((value + (value >>> 4)) & 0x0f0f0f0f) * 0x01010101) >>> 24;
+}
+
+function matcher(contains) {
+    // KMP automaton: transitions[state * 26 + letter] is the length of the
+    // longest prefix of contains that ends the text read so far.
+    var length = contains.length;
+    var transitions = new Int32Array((length + 1) * 26);
+    var failure = 0;
+
+    for (var state = 0; state <= length; state += 1) {
+        for (var letter = 0; letter < 26; letter += 1) {
+            if (state < length && contains[state] == letter) {
+                transitions[state * 26 + letter] = state + 1;
+            }
+            else if (state > 0) {
+                transitions[state * 26 + letter] = transitions[failure * 26 + letter];
+            }
+        }
+        if (state > 0 && state < length) {
+            failure = transitions[failure * 26 + contains[state]];
+        }
+    }
+    return transitions;
+}
+
+function Search(id, letters, contains) {
+    // The letters of contains are free and are placed at their leftmost
+    // occurrence, and a real tile is always used before a blank, so every
+    // word is reached by exactly one path and needs no de-duplication.
+    // The traversal uses an explicit stack so it can pause between slices.
+    var depth = letters.length + 2;
+
+    this.id = id;
+    this.counts = new Int32Array(27);
+    this.contains = [];
+    this.value = [];
+    this.states = new Uint32Array(depth);
+    this.matched = new Int32Array(depth);
+    this.cursors = new Int32Array(depth);
+    this.tiles = new Int32Array(depth);
+    this.widths = new Int32Array(depth);
+    this.size = 0;
+
+    for (var index = 0; index < letters.length; index += 1) {
+        var letter = letters[index];
+        this.counts[letter == '?' ? 26 : letter.charCodeAt(0) - 97] += 1;
+    }
+    for (var index = 0; index < contains.length; index += 1) {
+        this.contains.push(contains.charCodeAt(index) - 97);
+    }
+    this.transitions = matcher(this.contains);
+    this.push(0, 0, -1, 0);
+}
+
+Search.prototype.push = function (state, matched, tile, width) {
+    var size = this.size;
+
+    this.states[size] = state;
+    this.matched[size] = matched;
+    this.cursors[size] = -1;
+    this.tiles[size] = tile;
+    this.widths[size] = width;
+    this.size = size + 1;
+};
+
+Search.prototype.anchor = function (state, matched) {
+    var masks = graph.masks;
+    var contains = this.contains;
+    var length = contains.length;
+
+    for (var index = 0; index < length; index += 1) {
+        var letter = contains[index];
+        var mask = masks[state];
+        var bit = 1 << letter;
+
+        matched = this.transitions[matched * 26 + letter];
+
+        if (!(mask & bit) || (matched == length && index < length - 1)) {
+            this.value.length -= index;
+            return;
+        }
+        this.value.push(97 + letter);
+        state = graph.edges[graph.offsets[state] + popcount(mask & (bit - 1))];
+    }
+    this.push(state, -1, -1, length);
+};
+
+// Runs until the traversal finishes or the deadline passes. Returns the words
+// found, keyed by length, and sets this.done when nothing is left.
+Search.prototype.step = function (deadline) {
+    var masks = graph.masks;
+    var offsets = graph.offsets;
+    var edges = graph.edges;
+    var counts = this.counts;
+    var value = this.value;
+    var length = this.contains.length;
+    var groups = {};
+    var steps = 0;
+
+    while (this.size > 0) {
+        steps += 1;
+
+        if ((steps & 1023) == 0 && performance.now() > deadline) {
+            return groups;
+        }
+
+        var top = this.size - 1;
+        var state = this.states[top];
+        var matched = this.matched[top];
+        var mask = masks[state];
+        var letter = this.cursors[top];
+
+        if (letter < 0) {
+            this.cursors[top] = 0;
+
+            if (matched >= 0) {
+                this.anchor(state, matched);
+            }
+            else if (mask & 0x80000000) {
+                (groups[value.length] = groups[value.length] || []).push(
+                    String.fromCharCode.apply(null, value)
+                );
+            }
+            continue;
+        }
+
+        for (; letter < 26; letter += 1) {
+            var bit = 1 << letter;
+
+            if (!(mask & bit)) {
+                continue;
+            }
+            var tile = counts[letter] > 0 ? letter : 26;
+            var next = matched < 0 ? -1 : this.transitions[matched * 26 + letter];
+
+            if (counts[tile] > 0 && next < length) {
+                break;
+            }
+        }
+
+        if (letter == 26) {
+            if (this.tiles[top] >= 0) {
+                counts[this.tiles[top]] += 1;
+            }
+            value.length -= this.widths[top];
+            this.size = top;
+            continue;
+        }
+
+        this.cursors[top] = letter + 1;
+        counts[tile] -= 1;
+        value.push(97 + letter);
+        this.push(
+            edges[offsets[state] + popcount(mask & (bit - 1))], next, tile, 1
+        );
+    }
+
+    this.done = true;
+    return groups;
+};
+
+function run(search) {
+    if (current !== search) {
+        return;
+    }
+
+    var groups = search.step(performance.now() + SLICE_MILLISECONDS);
+    var lengths = Object.keys(groups).sort(function (alpha, beta) {
+        return beta - alpha;
+    });
+
+    postMessage({
+        id: search.id,
+        groups: lengths.map(function (length) {
+            return [Number(length), groups[length]];
+        }),
+        done: Boolean(search.done),
+    });
+
+    if (!search.done) {
+        setTimeout(run, 0, search);
+    }
+}
+
+onmessage = function (event) {
+    var query = event.data;
+
+    // The page sends the hashed dawg.bin URL before any query.
+    if (query.dawg) {
+        load(query.dawg).then(function () {
+            if (current !== null) {
+                run(current);
+            }
+        });
+        return;
+    }
+
+    current = new Search(query.id, query.letters, query.contains);
+
+    if (graph !== null) {
+        run(current);
+    }
+};